@@ -0,0 +1,37 @@
+"""
+Access control for the admin-only diagnostic routes.
+
+Admin routes expose SQL parameters and profiles, so they are only served to
+requests carrying ``ADMIN_TOKEN`` in the ``X-Admin-Token`` header or the
+``admin_token`` query argument. With no ``ADMIN_TOKEN`` set they are
+disabled.
+"""
+import functools
+import hmac
+import os
+
+from flask import jsonify, request
+
+
+def token():
+    return os.environ.get('ADMIN_TOKEN', '')
+
+
+def is_admin(req=None):
+    """True if the request carries the configured admin token."""
+    req = req or request
+    expected = token()
+    supplied = req.headers.get('X-Admin-Token') or req.args.get('admin_token') or ''
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+def admin_required(view):
+    """Answer 403 unless the request is from an admin."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not token():
+            return jsonify({'status': 'error', 'message': 'Admin routes are disabled; set ADMIN_TOKEN'}), 403
+        if not is_admin():
+            return jsonify({'status': 'error', 'message': 'Admin token required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
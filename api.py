@@ -0,0 +1,55 @@
+"""
+Conditional responses for the read-only JSON API.
+
+Every API response carries a strong ETag derived from the shared data
+version (see ``ledger.data_version``), the API version and the request's
+path and query string. A client that sends it back in ``If-None-Match`` gets
+``304 Not Modified`` after a single lookup of the data version, without the
+payload being computed or sent, until any write bumps the version.
+"""
+import functools
+import hashlib
+from datetime import date, datetime
+
+from flask import Response, jsonify, request
+
+VERSION = 'v1'
+PREFIX = f'/api/{VERSION}'
+
+
+def etag(data_version, path, query_string=b''):
+    raw = f'{VERSION}|{data_version}|{path}|'.encode() + query_string
+    return hashlib.sha1(raw).hexdigest()[:24]
+
+
+def conditional(version_func):
+    """
+    Serve a view's JSON with an ETag and answer matching ``If-None-Match`` with 304.
+
+    The view returns a JSON-serialisable value, or an error response tuple
+    which is passed through without an ETag.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = etag(version_func(), request.path, request.query_string)
+            if request.if_none_match.contains(tag):
+                response = Response(status=304)
+            else:
+                result = view(*args, **kwargs)
+                if isinstance(result, tuple):
+                    return result
+                response = jsonify(result)
+            response.set_etag(tag)
+            # Clients may keep the response but must revalidate before reuse
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def row_dict(row):
+    """A listing row (or a namedtuple) as JSON-friendly values."""
+    mapping = row._mapping if hasattr(row, '_mapping') else row._asdict()
+    return {name: value.isoformat() if isinstance(value, (date, datetime)) else value
+            for name, value in mapping.items()}
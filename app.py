@@ -1,10 +1,34 @@
-from flask import Flask, render_template, request, jsonify, flash, send_file
+from flask import Flask, Response, render_template, request, jsonify, flash, send_file, send_from_directory, g, url_for
+import click
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
-import pandas as pd
+from werkzeug.exceptions import HTTPException
+from sqlalchemy import func, text
+from datetime import datetime
 import os
 import calendar
-import io
+import tempfile
+import time
+
+import api
+import assets
+import db_pool
+import ledger
+import metrics
+import migrations
+import profiling
+import readonly
+import search
+import slow_queries
+import startup
+import summary
+import warmup
+from admin import admin_required
+from aggregation import aggregate
+from cache import SummaryCache
+from export_jobs import ExportJobs
+from ingest import PayloadError, insert_rows, parse_records, validate_records
+from table_export import FORMATS as TABLE_EXPORT_FORMATS, ExportError, stream_table
+from pagination import apply_filters, filtered_totals, keyset_page, parse_filters, parse_per_page
 
 app = Flask(__name__)
 
@@ -18,12 +42,23 @@ if database_url:
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///food_truck.db'
 
+# Pool sizing, pre-ping, recycling and statement timeout (see db_pool.py)
+pool_settings = db_pool.settings()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_pool.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], pool_settings)
+
 # Use environment variable for secret key
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 db = SQLAlchemy(app)
 
 
+# Indexes are declared here for new databases and added to existing ones by migrations.py
+
 class Investment(db.Model):
+    __table_args__ = (
+        db.Index('ix_investment_date_id', 'date', 'id'),
+        db.Index('ix_investment_investor_name', 'investor_name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     investor_name = db.Column(db.String(100), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -31,6 +66,10 @@ class Investment(db.Model):
 
 
 class Expense(db.Model):
+    __table_args__ = (
+        db.Index('ix_expense_date_id', 'date', 'id'),
+        db.Index('ix_expense_category_date', 'category', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -39,40 +78,254 @@ class Expense(db.Model):
 
 
 class Sale(db.Model):
+    __table_args__ = (
+        db.Index('ix_sale_date_id', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     description = db.Column(db.String(200))
 
 
+class LedgerTotal(db.Model):
+    """Running total and row count per table and per investor (see ledger.py)."""
+    key = db.Column(db.String(120), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+ledger.install(db.session, LedgerTotal, Investment, Expense, Sale)
+
+# Statements slower than SLOW_QUERY_MS are logged with their plans (see slow_queries.py)
+slow_query_settings = slow_queries.settings()
+slow_query_log = slow_queries.SlowQueryLog(metrics.default_directory())
+
 with app.app_context():
-    db.create_all()
+    db_pool.install(db.engine, pool_settings)
+    metrics.init_app(app, db.engine)
+    slow_queries.install(db.engine, slow_query_log, slow_query_settings, logger=app.logger)
+
+
+def endpoint_for(environ):
+    try:
+        return app.url_map.bind_to_environ(environ).match()[0]
+    except HTTPException:
+        return None
+
+
+# Admin requests with ?profile=1 are profiled end to end (see profiling.py)
+profile_settings = profiling.settings()
+profile_store = profiling.ProfileStore(profile_settings['directory'], profile_settings['max_bytes'])
+app.wsgi_app = profiling.ProfilingMiddleware(app.wsgi_app, profile_store, profile_settings['interval'],
+                                             endpoint_for=endpoint_for, logger=app.logger)
+
+# Bundled, minified and fingerprinted CSS/JS via asset_url() in templates (see assets.py)
+asset_bundles = assets.init_app(app)
+
+_initialized = False
+
+
+def init_db():
+    """Create missing tables and build the ledger, once per process (see startup.py)."""
+    global _initialized
+    if _initialized:
+        return
+    with app.app_context(), startup.init_lock(db.engine):
+        db.create_all()
+        # Production applies migrations once per deploy (entrypoint.sh); local SQLite on start
+        if db.engine.dialect.name == 'sqlite':
+            migrations.upgrade(db.engine, echo=app.logger.info)
+        ledger.ensure(db.session)
+        db.session.remove()
+    _initialized = True
+
+
+def create_app():
+    """Initialised application; gunicorn runs this once in the master with preload_app."""
+    init_db()
+    return app
+
+
+@app.before_request
+def ensure_initialized():
+    # Only does work when the server imported ``app`` without calling create_app();
+    # the probes report initialisation failures themselves
+    if not _initialized and request.endpoint not in ('health', 'ready'):
+        init_db()
+
+
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List pending migrations without applying them.')
+def migrate_command(status):
+    """Apply pending schema migrations (indexes are built without blocking writes)."""
+    init_db()
+    if status:
+        for migration in migrations.pending(db.engine):
+            click.echo(f"pending {migration.id}: {migration.description}")
+        return
+    applied = migrations.upgrade(db.engine, echo=click.echo)
+    click.echo(f"{len(applied)} migration(s) applied" if applied else "Database is up to date")
+
+
+@app.cli.command('assets')
+@click.option('--clean', is_flag=True, help='Also delete fingerprinted files from earlier builds.')
+def assets_command(clean):
+    """Build the minified, fingerprinted static bundles into static/dist."""
+    manifest = asset_bundles.build()
+    for name in assets.BUNDLES:
+        click.echo(f"{name} -> {assets.DIST}/{manifest[name]}")
+    if clean:
+        removed = asset_bundles.clean(manifest)
+        click.echo(f"{len(removed)} stale file(s) removed")
+
+
+@app.cli.command('ledger')
+@click.argument('action', type=click.Choice(['rebuild', 'verify']))
+def ledger_command(action):
+    """Rebuild the running-totals ledger or verify it against the base tables."""
+    if action == 'rebuild':
+        rows = ledger.rebuild(db.session)
+        click.echo(f"Ledger rebuilt: {len(rows)} rows")
+        return
+
+    mismatches = ledger.verify(db.session)
+    for key, have, want in mismatches:
+        click.echo(f"MISMATCH {key}: ledger total={have[0]:.2f} count={have[1]}, "
+                   f"expected total={want[0]:.2f} count={want[1]}")
+    if mismatches:
+        raise SystemExit(1)
+    click.echo("Ledger OK")
+
+
+def current_data_version():
+    """Shared data version, read at most once per request."""
+    if 'data_version' not in g:
+        g.data_version = ledger.data_version(db.session)
+    return g.data_version
+
+
+summary_cache = SummaryCache(current_data_version,
+                             maxsize=int(os.environ.get('SUMMARY_CACHE_SIZE', 256)),
+                             ttl=int(os.environ.get('SUMMARY_CACHE_TTL', 300)))
+
+
+def summary_figures(recent=0):
+    """Totals, counts, per-investor sums and ``recent`` activity in one query."""
+    figures = summary.load(db.session, LedgerTotal, Expense, Sale, recent=recent)
+    # The same statement read the data version, so cached lookups later in
+    # this request need no extra round trip
+    g.data_version = figures['data_version']
+    return figures
+
+
+@summary_cache.memoize
+def expense_category_totals():
+    """Expense totals per category, computed with one GROUP BY."""
+    rows = db.session.query(Expense.category, func.sum(Expense.amount)) \
+        .group_by(Expense.category).all()
+    return {category: float(total) for category, total in rows}
 
 
 @app.route('/')
 def index():
-    total_investment = sum(inv.amount for inv in Investment.query.all())
-    total_expenses = sum(exp.amount for exp in Expense.query.all())
-    total_sales = sum(sale.amount for sale in Sale.query.all())
+    figures = summary_figures()
+    return render_template('index.html',
+                           total_investment=figures['total_investment'],
+                           total_expenses=figures['total_expenses'],
+                           total_sales=figures['total_sales'],
+                           investment_count=figures['investment_count'],
+                           expense_count=figures['expense_count'],
+                           sale_count=figures['sale_count'])
 
-    investment_count = Investment.query.count()
-    expense_count = Expense.query.count()
-    sale_count = Sale.query.count()
 
-    return render_template('index.html',
-                           total_investment=total_investment,
-                           total_expenses=total_expenses,
-                           total_sales=total_sales,
-                           investment_count=investment_count,
-                           expense_count=expense_count,
-                           sale_count=sale_count)
+@app.route('/cache_stats')
+@admin_required
+def cache_stats():
+    stats = summary_cache.stats()
+    stats['pid'] = os.getpid()
+    stats['data_version'] = current_data_version()
+    return jsonify(stats)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/pool_stats')
+@admin_required
+def pool_stats():
+    stats = db_pool.pool_status(db.engine)
+    stats['pid'] = os.getpid()
+    stats['settings'] = pool_settings
+    return jsonify(stats)
+
+
+@app.route('/admin/slow_queries')
+@admin_required
+def slow_query_report():
+    """Slow statements since the workers started, most total time first."""
+    return jsonify({
+        'threshold_ms': slow_query_settings['threshold_ms'],
+        'statements': slow_query_log.top(request.args.get('limit', 20, type=int)),
+    })
+
+
+@app.route('/admin/profiles')
+@admin_required
+def profile_index():
+    """Recently profiled requests, newest first, with links to their files."""
+    profiles = profile_store.recent(request.args.get('limit', 50, type=int))
+    for profile in profiles:
+        profile['files'] = {
+            'cprofile': url_for('profile_file', filename=f"{profile['id']}.prof"),
+            'speedscope': url_for('profile_file', filename=f"{profile['id']}.speedscope.json"),
+        }
+    return jsonify({'profiles': profiles, 'disk_bytes': profile_store.disk_usage(),
+                    'max_bytes': profile_store.max_bytes})
+
+
+@app.route('/admin/profiles/<path:filename>')
+@admin_required
+def profile_file(filename):
+    return send_from_directory(profile_store.directory, filename, as_attachment=True)
+
+
+def listing_page(model):
+    """
+    One page of ``model`` plus the DB-side total of the filtered range.
+
+    With a ``q`` search on a searchable table, the page holds the best
+    matches first (see search.py); otherwise the newest rows, by keyset.
+    """
+    filters = parse_filters(request.args)
+    query = apply_filters(readonly.rows(db.session, model), model, filters)
+    q = request.args.get('q', '').strip()
+    searching = search.searchable(model) and bool(search.terms(q))
+    if searching:
+        query, order_by = search.apply_search(query, model, q, db.engine.dialect.name)
+    total, count = filtered_totals(query, model)
+    if searching:
+        page = search.ranked_page(query, order_by,
+                                  after=request.args.get('after'),
+                                  before=request.args.get('before'),
+                                  per_page=parse_per_page(request.args))
+    else:
+        page = keyset_page(query, model,
+                           after=request.args.get('after'),
+                           before=request.args.get('before'),
+                           per_page=parse_per_page(request.args))
+    # Filter args carried over into the pager links
+    filter_args = {name: request.args[name] for name in ('from', 'to', 'category', 'q', 'per_page')
+                   if request.args.get(name)}
+    return page, {'total': total, 'count': count, 'filter_args': filter_args,
+                  'searchable': search.searchable(model), 'searching': searching}
 
 
 @app.route('/investments')
 def investments():
-    investments = Investment.query.order_by(Investment.date.desc()).all()
-    total_investment = sum(inv.amount for inv in investments)
-    return render_template('investments.html', investments=investments, total=total_investment)
+    page, listing = listing_page(Investment)
+    return render_template('investments.html', investments=page.items, page=page, **listing)
 
 
 @app.route('/add_investment', methods=['POST'])
@@ -90,9 +343,8 @@ def add_investment():
 
 @app.route('/expenses')
 def expenses():
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    total_expenses = sum(exp.amount for exp in expenses)
-    return render_template('expenses.html', expenses=expenses, total=total_expenses)
+    page, listing = listing_page(Expense)
+    return render_template('expenses.html', expenses=page.items, page=page, **listing)
 
 
 @app.route('/add_expense', methods=['POST'])
@@ -111,9 +363,8 @@ def add_expense():
 
 @app.route('/sales')
 def sales():
-    sales = Sale.query.order_by(Sale.date.desc()).all()
-    total_sales = sum(sale.amount for sale in sales)
-    return render_template('sales.html', sales=sales, total=total_sales)
+    page, listing = listing_page(Sale)
+    return render_template('sales.html', sales=page.items, page=page, **listing)
 
 
 @app.route('/add_sale', methods=['POST'])
@@ -215,266 +466,36 @@ def edit_sale(id):
     })
 
 
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def report_filename():
+    return f'London_Kitchen_Complete_Report_{datetime.now().strftime("%Y-%m-%d_%H-%M")}.xlsx'
+
+
+def render_report(output):
+    """Write the complete Excel report to ``output``."""
+    # openpyxl is only imported once the first report is written
+    from excel_export import write_report
+    started = time.perf_counter()
+    counts = write_report(output, db.session, Investment, Expense, Sale,
+                          summary_figures(), expense_category_totals())
+    metrics.observe_export('xlsx', output.tell(), time.perf_counter() - started)
+    return counts
+
+
 @app.route('/export_data')
 def export_data():
     try:
-        # Create a buffer to store the Excel file
-        output = io.BytesIO()
-
-        # Import openpyxl styles for formatting
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils.dataframe import dataframe_to_rows
-        from openpyxl.worksheet.table import Table, TableStyleInfo
-
-        # Create Excel writer with formatting
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            workbook = writer.book
-
-            # Define styles
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="2F75B5", end_color="2F75B5", fill_type="solid")
-            currency_fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                           top=Side(style='thin'), bottom=Side(style='thin'))
-
-            # Export Investments with enhanced formatting
-            investments = Investment.query.all()
-            inv_data = [{
-                'Date': i.date.strftime('%Y-%m-%d'),
-                'Investor': i.investor_name,
-                'Amount': i.amount,
-                'Investment ID': f"INV-{i.id:03d}"
-            } for i in investments]
-
-            inv_df = pd.DataFrame(inv_data)
-            inv_df.to_excel(writer, sheet_name='Investments', index=False)
-
-            # Format Investment sheet
-            inv_sheet = writer.sheets['Investments']
-            inv_sheet.column_dimensions['A'].width = 12  # Date
-            inv_sheet.column_dimensions['B'].width = 20  # Investor
-            inv_sheet.column_dimensions['C'].width = 15  # Amount
-            inv_sheet.column_dimensions['D'].width = 12  # Investment ID
-
-            # Apply header formatting
-            for col in ['A1', 'B1', 'C1', 'D1']:
-                cell = inv_sheet[col]
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-                cell.border = border
-
-            # Apply currency format and borders
-            for row in range(2, len(inv_data) + 2):
-                inv_sheet[f'C{row}'].number_format = '"£"#,##0.00'
-                inv_sheet[f'C{row}'].fill = currency_fill
-                for col in ['A', 'B', 'C', 'D']:
-                    inv_sheet[f'{col}{row}'].border = border
-
-            # Add table formatting
-            if inv_data:
-                inv_table = Table(displayName="InvestmentsTable", 
-                                ref=f"A1:D{len(inv_data)+1}")
-                inv_table.tableStyleInfo = TableStyleInfo(
-                    name="TableStyleMedium9", showFirstColumn=False,
-                    showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-                inv_sheet.add_table(inv_table)
-
-            # Export Expenses with enhanced formatting
-            expenses = Expense.query.all()
-            exp_data = [{
-                'Date': e.date.strftime('%Y-%m-%d'),
-                'Description': e.description,
-                'Category': e.category,
-                'Amount': e.amount,
-                'Expense ID': f"EXP-{e.id:03d}"
-            } for e in expenses]
-
-            exp_df = pd.DataFrame(exp_data)
-            exp_df.to_excel(writer, sheet_name='Expenses', index=False)
-
-            # Format Expense sheet
-            exp_sheet = writer.sheets['Expenses']
-            exp_sheet.column_dimensions['A'].width = 12  # Date
-            exp_sheet.column_dimensions['B'].width = 35  # Description
-            exp_sheet.column_dimensions['C'].width = 20  # Category
-            exp_sheet.column_dimensions['D'].width = 15  # Amount
-            exp_sheet.column_dimensions['E'].width = 12  # Expense ID
-
-            # Apply header formatting
-            for col in ['A1', 'B1', 'C1', 'D1', 'E1']:
-                cell = exp_sheet[col]
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-                cell.border = border
-
-            # Apply currency format and borders
-            for row in range(2, len(exp_data) + 2):
-                exp_sheet[f'D{row}'].number_format = '"£"#,##0.00'
-                exp_sheet[f'D{row}'].fill = currency_fill
-                for col in ['A', 'B', 'C', 'D', 'E']:
-                    exp_sheet[f'{col}{row}'].border = border
-
-            # Add table formatting
-            if exp_data:
-                exp_table = Table(displayName="ExpensesTable", 
-                                ref=f"A1:E{len(exp_data)+1}")
-                exp_table.tableStyleInfo = TableStyleInfo(
-                    name="TableStyleMedium9", showFirstColumn=False,
-                    showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-                exp_sheet.add_table(exp_table)
-
-            # Export Sales with enhanced formatting
-            sales = Sale.query.all()
-            sales_data = [{
-                'Date': s.date.strftime('%Y-%m-%d'),
-                'Description': s.description,
-                'Amount': s.amount,
-                'Sale ID': f"SAL-{s.id:03d}"
-            } for s in sales]
-
-            sales_df = pd.DataFrame(sales_data)
-            sales_df.to_excel(writer, sheet_name='Sales', index=False)
-
-            # Format Sales sheet
-            sales_sheet = writer.sheets['Sales']
-            sales_sheet.column_dimensions['A'].width = 12  # Date
-            sales_sheet.column_dimensions['B'].width = 35  # Description
-            sales_sheet.column_dimensions['C'].width = 15  # Amount
-            sales_sheet.column_dimensions['D'].width = 12  # Sale ID
-
-            # Apply header formatting
-            for col in ['A1', 'B1', 'C1', 'D1']:
-                cell = sales_sheet[col]
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-                cell.border = border
-
-            # Apply currency format and borders
-            for row in range(2, len(sales_data) + 2):
-                sales_sheet[f'C{row}'].number_format = '"£"#,##0.00'
-                sales_sheet[f'C{row}'].fill = currency_fill
-                for col in ['A', 'B', 'C', 'D']:
-                    sales_sheet[f'{col}{row}'].border = border
-
-            # Add table formatting
-            if sales_data:
-                sales_table = Table(displayName="SalesTable", 
-                                ref=f"A1:D{len(sales_data)+1}")
-                sales_table.tableStyleInfo = TableStyleInfo(
-                    name="TableStyleMedium9", showFirstColumn=False,
-                    showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-                sales_sheet.add_table(sales_table)
-
-            # Create comprehensive Summary sheet
-            total_investment = sum(i.amount for i in investments)
-            total_expenses = sum(e.amount for e in expenses)
-            total_sales = sum(s.amount for s in sales)
-            net_profit = total_sales - total_expenses
-
-            # Calculate investment shares
-            shree_investment = sum(
-                i.amount for i in investments if i.investor_name == 'Shree')
-            adwait_investment = sum(
-                i.amount for i in investments if i.investor_name == 'Adwait')
-
-            # Calculate category breakdown for expenses
-            expense_categories = {}
-            for expense in expenses:
-                if expense.category in expense_categories:
-                    expense_categories[expense.category] += expense.amount
-                else:
-                    expense_categories[expense.category] = expense.amount
-
-            # Create comprehensive summary data
-            summary_data = [
-                ['London\'s Kitchen - Complete Financial Report', ''],
-                [f'Generated on: {datetime.now().strftime("%d/%m/%Y %H:%M")}', ''],
-                ['', ''],
-                ['📊 BUSINESS OVERVIEW', ''],
-                ['Total Investments', total_investment],
-                ['Total Expenses', total_expenses],
-                ['Total Sales Revenue', total_sales],
-                ['Net Profit/Loss', net_profit],
-                ['Profit Margin', f"{(net_profit/total_sales*100):.1f}%" if total_sales > 0 else "0.0%"],
-                ['', ''],
-                ['💰 INVESTMENT ANALYSIS', ''],
-                ['Total Number of Investments', len(investments)],
-                ['Average Investment Amount', total_investment/len(investments) if investments else 0],
-                ['Adwait\'s Total Investment', adwait_investment],
-                ['Shree\'s Total Investment', shree_investment],
-                ['Adwait\'s Investment %', f"{(adwait_investment/total_investment*100):.1f}%" if total_investment > 0 else "0.0%"],
-                ['Shree\'s Investment %', f"{(shree_investment/total_investment*100):.1f}%" if total_investment > 0 else "0.0%"],
-                ['', ''],
-                ['💸 EXPENSE ANALYSIS', ''],
-                ['Total Number of Expenses', len(expenses)],
-                ['Average Expense Amount', total_expenses/len(expenses) if expenses else 0],
-                ['', ''],
-                ['Expense Categories Breakdown:', ''],
-            ]
-
-            # Add expense categories
-            for category, amount in sorted(expense_categories.items(), key=lambda x: x[1], reverse=True):
-                summary_data.append([f"  {category}", amount])
-
-            # Continue with sales analysis
-            summary_data.extend([
-                ['', ''],
-                ['💵 SALES ANALYSIS', ''],
-                ['Total Number of Sales', len(sales)],
-                ['Average Sale Amount', total_sales/len(sales) if sales else 0],
-                ['', ''],
-                ['📈 PROFIT DISTRIBUTION', ''],
-                ['Available for Distribution', net_profit],
-                ['Adwait\'s Profit Share', f"£{net_profit * (adwait_investment/total_investment):,.2f}" if total_investment > 0 else "£0.00"],
-                ['Shree\'s Profit Share', f"£{net_profit * (shree_investment/total_investment):,.2f}" if total_investment > 0 else "£0.00"],
-                ['', ''],
-                ['🔍 DATA SUMMARY', ''],
-                ['Total Records in System', len(investments) + len(expenses) + len(sales)],
-                ['Data Export Date', datetime.now().strftime('%d/%m/%Y')],
-                ['Data Export Time', datetime.now().strftime('%H:%M:%S')],
-            ])
-
-            summary_df = pd.DataFrame(summary_data, columns=['Category', 'Amount'])
-            summary_df.to_excel(writer, sheet_name='Complete Summary', index=False)
-
-            # Format Complete Summary sheet
-            summary_sheet = writer.sheets['Complete Summary']
-            summary_sheet.column_dimensions['A'].width = 40
-            summary_sheet.column_dimensions['B'].width = 25
-
-            # Apply enhanced formatting to Summary sheet
-            summary_sheet['A1'].font = Font(bold=True, size=16, color="FFFFFF")
-            summary_sheet['A1'].fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-            summary_sheet['A2'].font = Font(italic=True, size=10)
-
-            # Apply section headers formatting
-            section_headers = ['A4', 'A11', 'A20', 'A26', 'A34']
-            for header in section_headers:
-                cell = summary_sheet[header]
-                cell.font = Font(bold=True, size=12, color="FFFFFF")
-                cell.fill = PatternFill(start_color="2F75B5", end_color="2F75B5", fill_type="solid")
-
-            # Apply currency format and borders
-            for row in range(1, len(summary_data) + 1):
-                summary_sheet[f'A{row}'].border = border
-                summary_sheet[f'B{row}'].border = border
-                
-                # Currency formatting for amount cells
-                if row in [5, 6, 7, 8, 13, 14, 15, 16, 22, 23, 25, 26, 27, 28, 29, 35, 36, 37, 38]:
-                    summary_sheet[f'B{row}'].number_format = '"£"#,##0.00'
-                    summary_sheet[f'B{row}'].fill = currency_fill
-                elif row in [9, 15, 16, 30]:
-                    summary_sheet[f'B{row}'].number_format = '0.0%'
-
+        # Spool the workbook to a temporary file rather than a BytesIO buffer
+        output = tempfile.TemporaryFile()
+        render_report(output)
         output.seek(0)
         return send_file(
             output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            mimetype=XLSX_MIMETYPE,
             as_attachment=True,
-            download_name=f'London_Kitchen_Complete_Report_{datetime.now().strftime("%Y-%m-%d_%H-%M")}.xlsx'
+            download_name=report_filename()
         )
     except Exception as e:
         app.logger.error(f"Error in export_data: {str(e)}")
@@ -482,51 +503,159 @@ def export_data():
         return render_template('error.html', error=str(e))
 
 
+export_jobs = ExportJobs(
+    os.environ.get('EXPORT_JOB_DIR', os.path.join(tempfile.gettempdir(), 'londons_kitchen_exports')),
+    max_workers=int(os.environ.get('EXPORT_JOB_THREADS', 2)),
+    max_concurrent=int(os.environ.get('EXPORT_JOB_CONCURRENCY', 1)),
+    ttl=int(os.environ.get('EXPORT_JOB_TTL', 3600)),
+    logger=app.logger)
+
+
+def run_report_job(output):
+    with app.app_context():
+        render_report(output)
+
+
+def export_job_response(state):
+    state = dict(state, status_url=url_for('export_job_status', job_id=state['id']))
+    if state['status'] == 'done':
+        state['download_url'] = url_for('export_job_download', job_id=state['id'])
+    return state
+
+
+@app.route('/export_jobs', methods=['POST'])
+def start_export_job():
+    job_id = export_jobs.submit(run_report_job, filename=report_filename())
+    return jsonify(export_job_response(export_jobs.status(job_id))), 202
+
+
+@app.route('/export_jobs/<job_id>')
+def export_job_status(job_id):
+    state = export_jobs.status(job_id)
+    if state is None:
+        return jsonify({'status': 'error', 'message': 'Export job not found or expired'}), 404
+    return jsonify(export_job_response(state))
+
+
+@app.route('/export_jobs/<job_id>/download')
+def export_job_download(job_id):
+    state = export_jobs.status(job_id)
+    if state is None or state['status'] != 'done':
+        return jsonify({'status': 'error', 'message': 'Export is not ready'}), 404
+    return send_file(export_jobs.output_path(job_id), mimetype=XLSX_MIMETYPE,
+                     as_attachment=True, download_name=state['filename'])
+
+
+EXPORT_TABLES = {'investments': Investment, 'expenses': Expense, 'sales': Sale}
+
+
+@app.route('/export/<table>.<fmt>')
+def export_table(table, fmt):
+    """Stream one raw table as CSV, NDJSON or Parquet."""
+    model = EXPORT_TABLES.get(table)
+    if model is None:
+        return jsonify({'status': 'error', 'message': f"Unknown table '{table}'"}), 404
+    try:
+        chunks = stream_table(db.engine, model.__table__, fmt)
+    except ExportError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return Response(metrics.counted(chunks, fmt), content_type=TABLE_EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={table}_{datetime.now().strftime("%Y-%m-%d")}.{fmt}'
+    })
+
+
+@app.cli.command('export-table')
+@click.argument('table', type=click.Choice(list(EXPORT_TABLES)))
+@click.option('--format', 'fmt', type=click.Choice(list(TABLE_EXPORT_FORMATS)), default='csv')
+@click.option('--output', '-o', type=click.File('wb'), default='-',
+              help='File to write to (default: stdout).')
+def export_table_command(table, fmt, output):
+    """Stream one raw table as CSV, NDJSON or Parquet."""
+    try:
+        for chunk in stream_table(db.engine, EXPORT_TABLES[table].__table__, fmt):
+            output.write(chunk)
+    except ExportError as e:
+        raise click.ClickException(str(e))
+
+
+BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', 50000))
+
+
+@app.route('/bulk/<table>', methods=['POST'])
+def bulk_ingest(table):
+    """Insert many records at once from a JSON array, NDJSON or CSV upload."""
+    model = EXPORT_TABLES.get(table)
+    if model is None:
+        return jsonify({'status': 'error', 'message': f"Unknown table '{table}'"}), 404
+
+    upload = request.files.get('file')
+    if upload:
+        body = upload.read()
+        content_type = upload.mimetype
+        if upload.filename.endswith('.csv'):
+            content_type = 'text/csv'
+        elif upload.filename.endswith(('.ndjson', '.jsonl')):
+            content_type = 'application/x-ndjson'
+    else:
+        body = request.get_data()
+        content_type = request.mimetype
+
+    try:
+        rows, errors = validate_records(model.__table__, parse_records(body, content_type),
+                                        max_rows=BULK_MAX_ROWS)
+    except PayloadError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    # Rows bypass the ORM, so the ledger is updated explicitly in the same transaction
+    connection = db.session.connection()
+    insert_rows(connection, model.__table__, rows)
+    ledger.apply_deltas(connection, ledger.row_deltas(ledger.key_for(model), rows))
+    db.session.commit()
+
+    return jsonify({
+        'status': 'partial' if errors else 'success',
+        'inserted': len(rows),
+        'errors': errors
+    })
+
+
+@summary_cache.memoize
+def monthly_series(model, year):
+    """Per-month totals and counts for ``model`` in ``year``, one GROUP BY query."""
+    buckets = aggregate(db.session, model.date, model.amount, 'month',
+                        start=datetime(year, 1, 1), end=datetime(year + 1, 1, 1))
+    return [{
+        'month': calendar.month_name[b.start.month],
+        'total': b.total,
+        'count': b.count
+    } for b in buckets]
+
+
+# monthly_series() bounds the year with datetime(year + 1, 1, 1)
+MIN_YEAR, MAX_YEAR = 1, 9998
+
+
+def requested_year():
+    """The ``year`` query arg (default: this year), or None if it is out of range."""
+    year = request.args.get('year', datetime.now().year, type=int)
+    return year if MIN_YEAR <= year <= MAX_YEAR else None
+
+
 @app.route('/dashboard')
 def dashboard():
-    total_investment = sum(inv.amount for inv in Investment.query.all())
-    total_expenses = sum(exp.amount for exp in Expense.query.all())
-    total_sales = sum(sale.amount for sale in Sale.query.all())
+    # Headline totals and the investor split come from the ledger read alone;
+    # the monthly series and recent activity are fetched by the page from the
+    # API (api_series, api_activity) so they never delay the first paint
+    figures = summary_figures()
+    total_investment = figures['total_investment']
+    total_expenses = figures['total_expenses']
+    total_sales = figures['total_sales']
+    shree_total = figures['investors'].get('Shree', 0.0)
+    adwait_total = figures['investors'].get('Adwait', 0.0)
     net_profit_loss = total_sales - total_expenses
 
-    # Calculate shares
-    investments = Investment.query.all()
-    shree_total = sum(
-        i.amount for i in investments if i.investor_name == 'Shree')
-    adwait_total = sum(
-        i.amount for i in investments if i.investor_name == 'Adwait')
-
-    # Get recent activity (last 10 items)
-    recent_expenses = Expense.query.order_by(
-        Expense.date.desc()).limit(5).all()
-    recent_sales = Sale.query.order_by(Sale.date.desc()).limit(5).all()
-    
-    # Monthly sales analysis for the current year
-    current_year = datetime.now().year
-    monthly_sales = []
-    monthly_expenses = []
-    
-    for month in range(1, 13):
-        start_date = datetime(current_year, month, 1)
-        if month == 12:
-            end_date = datetime(current_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = datetime(current_year, month + 1, 1) - timedelta(days=1)
-            
-        month_sales = Sale.query.filter(Sale.date >= start_date, Sale.date <= end_date).all()
-        month_expenses = Expense.query.filter(Expense.date >= start_date, Expense.date <= end_date).all()
-        
-        monthly_sales.append({
-            'month': calendar.month_name[month],
-            'total': sum(sale.amount for sale in month_sales),
-            'count': len(month_sales)
-        })
-        
-        monthly_expenses.append({
-            'month': calendar.month_name[month],
-            'total': sum(expense.amount for expense in month_expenses),
-            'count': len(month_expenses)
-        })
+    # Monthly sales analysis for the requested year (defaults to the current one)
+    current_year = requested_year() or datetime.now().year
 
     return render_template('dashboard.html',
                            total_investment=total_investment,
@@ -535,13 +664,143 @@ def dashboard():
                            net_profit_loss=net_profit_loss,
                            adwait_investment=adwait_total,
                            shree_investment=shree_total,
-                           recent_expenses=recent_expenses,
-                           recent_sales=recent_sales,
-                           monthly_sales=monthly_sales,
-                           monthly_expenses=monthly_expenses,
                            current_year=current_year)
 
 
+def shares(totals):
+    """``[{name, total, share}]`` largest first; shares are fractions of the overall total."""
+    overall = sum(totals.values())
+    return [{'name': name, 'total': total, 'share': total / overall if overall else 0.0}
+            for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)]
+
+
+@app.route(f'{api.PREFIX}/summary')
+@api.conditional(current_data_version)
+def api_summary():
+    """Totals, counts, net profit/loss and per-investor shares."""
+    figures = summary_figures()
+    return {
+        'data_version': figures['data_version'],
+        'totals': {
+            'investment': figures['total_investment'],
+            'expenses': figures['total_expenses'],
+            'sales': figures['total_sales'],
+            'net_profit_loss': figures['total_sales'] - figures['total_expenses'],
+        },
+        'counts': {
+            'investments': figures['investment_count'],
+            'expenses': figures['expense_count'],
+            'sales': figures['sale_count'],
+        },
+        'investors': shares(figures['investors']),
+    }
+
+
+@app.route(f'{api.PREFIX}/categories')
+@api.conditional(current_data_version)
+def api_categories():
+    """Expense totals and shares per category."""
+    categories = shares(expense_category_totals())
+    for category in categories:
+        category['category'] = category.pop('name')
+    return {'categories': categories}
+
+
+@app.route(f'{api.PREFIX}/series')
+@api.conditional(current_data_version)
+def api_series():
+    """Monthly sales and expense totals for ``year`` (default: this year)."""
+    year = requested_year()
+    if year is None:
+        return jsonify({'status': 'error',
+                        'message': f'year must be between {MIN_YEAR} and {MAX_YEAR}'}), 400
+    return {
+        'year': year,
+        'sales': monthly_series(Sale, year),
+        'expenses': monthly_series(Expense, year),
+    }
+
+
+@app.route(f'{api.PREFIX}/activity')
+@api.conditional(current_data_version)
+def api_activity():
+    """The newest expenses and sales, newest first (``limit``, default 10)."""
+    limit = min(max(request.args.get('limit', summary.RECENT_LIMIT, type=int), 1), summary.MAX_RECENT)
+    figures = summary_figures(recent=limit)
+    return {'items': [api.row_dict(item) for item in figures['recent']]}
+
+
+@app.route(f'{api.PREFIX}/<table>')
+@api.conditional(current_data_version)
+def api_listing(table):
+    """One keyset page of a table, filtered like the listing pages."""
+    model = EXPORT_TABLES.get(table)
+    if model is None:
+        return jsonify({'status': 'error', 'message': f"Unknown table '{table}'"}), 404
+    page, listing = listing_page(model)
+    return {
+        'items': [api.row_dict(row) for row in page.items],
+        'total': listing['total'],
+        'count': listing['count'],
+        'per_page': page.per_page,
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+    }
+
+
+warmup_state = warmup.WarmupState()
+
+
+def warm_up():
+    """Open pool connections, compile templates and fill the summary cache."""
+    def prime_summaries():
+        # Only memoized lookups are worth running early: this year's series
+        # (the dashboard chart via /api/v1/series) and the category totals
+        year = datetime.now().year
+        expense_category_totals()
+        monthly_series(Sale, year)
+        monthly_series(Expense, year)
+        return summary_cache.stats()['size']
+
+    with app.app_context():
+        warmup.run(warmup_state, [
+            ('init', lambda: init_db() or True),
+            ('connections', lambda: warmup.open_connections(db.engine, pool_settings['pool_size'])),
+            ('templates', lambda: warmup.compile_templates(app.jinja_env)),
+            ('assets', lambda: len(asset_bundles.manifest)),
+            ('summaries', prime_summaries),
+        ])
+        db.session.remove()
+    return warmup_state
+
+
+@app.route('/health')
+def health():
+    """Liveness: the worker process is serving requests."""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+
+@app.route('/ready')
+def ready():
+    """Readiness: warm-up has finished and the database answers."""
+    # A worker started without the gunicorn hook warms up on its first probe
+    state = warm_up().as_dict()
+    try:
+        started = time.perf_counter()
+        db.session.execute(text('SELECT 1'))
+        database_ms = round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': f'Database unavailable: {e}',
+                        'warmup': state, 'pid': os.getpid()}), 503
+    if not state['done']:
+        return jsonify({'status': 'error', 'message': f"Warm-up failed: {state['error']}",
+                        'warmup': state, 'pid': os.getpid()}), 503
+    return jsonify({'status': 'ready', 'database_ms': database_ms,
+                    'warmup': state, 'pid': os.getpid()})
+
+
 if __name__ == '__main__':
+    warm_up()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,203 @@
+"""
+Static asset pipeline: bundling, minification and content-hash fingerprints.
+
+Stylesheets and scripts under ``static/`` (including the vendored Inter,
+Font Awesome and Chart.js files in ``static/vendor``) are combined into the
+bundles in ``BUNDLES``. CSS is minified, and every file a stylesheet refers
+to with ``url()`` is copied alongside with its own fingerprint. Output goes
+to ``static/dist/<name>.<hash>.<ext>`` with a ``manifest.json`` mapping
+bundle and source names to the fingerprinted files.
+
+A fingerprinted name changes whenever the content does, so ``dist/`` files
+are served with a one-year ``immutable`` Cache-Control and browsers never
+revalidate them. ``flask --app app assets`` builds the bundles at deploy
+time; otherwise the first ``asset_url()`` call in a process builds them if
+any source is newer than the manifest.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+
+from flask import request, url_for
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+
+# Bundle name -> source files, relative to the static folder, in order
+BUNDLES = {
+    'base.css': [
+        'vendor/inter/inter.css',
+        'vendor/fontawesome/css/fontawesome.min.css',
+        'vendor/fontawesome/css/solid.min.css',
+        'css/style.css',
+    ],
+    'index.css': ['css/index.css'],
+    'dashboard.css': ['css/dashboard.css'],
+    'chart.js': ['vendor/chartjs/chart.umd.min.js'],
+}
+
+_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_STRING_OR_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+
+
+def fingerprint(content):
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def _fingerprinted(path, content):
+    stem, ext = posixpath.splitext(posixpath.basename(path))
+    return f'{stem}.{fingerprint(content)}{ext}'
+
+
+def minify_css(css):
+    """Drop comments (except ``/*! ... */`` licence headers) and redundant whitespace."""
+    parts = []
+    for i, part in enumerate(_STRING_OR_COMMENT.split(css)):
+        if i % 2:
+            # Strings are kept verbatim; only licence comments survive
+            if part.startswith('/*') and not part.startswith('/*!'):
+                continue
+            parts.append(part + ('\n' if part.startswith('/*!') else ''))
+            continue
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r' ?([{};,>]) ?', r'\1', part)
+        part = re.sub(r': ', ':', part)
+        part = part.replace(';}', '}')
+        parts.append(part)
+    return ''.join(parts).strip() + '\n'
+
+
+class Assets:
+    """Builds the bundles and resolves names to fingerprinted URLs."""
+
+    def __init__(self, static_folder, bundles=None):
+        self.static_folder = static_folder
+        self.bundles = BUNDLES if bundles is None else bundles
+        self.dist = os.path.join(static_folder, DIST)
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def _sources(self):
+        """Every source file, including the files stylesheets refer to."""
+        paths = set()
+        for sources in self.bundles.values():
+            for source in sources:
+                paths.add(source)
+                if source.endswith('.css'):
+                    with open(os.path.join(self.static_folder, source), encoding='utf-8') as f:
+                        paths.update(self._referenced(source, f.read()))
+        return paths
+
+    def _referenced(self, source, css):
+        for _, url in _URL.findall(css):
+            if not url.startswith(('data:', 'http:', 'https:', '//', '#')):
+                yield posixpath.normpath(posixpath.join(posixpath.dirname(source), url.split('?')[0].split('#')[0]))
+
+    def stale(self):
+        manifest = os.path.join(self.dist, MANIFEST)
+        if not os.path.exists(manifest):
+            return True
+        built = os.path.getmtime(manifest)
+        return any(os.path.getmtime(os.path.join(self.static_folder, path)) > built
+                   for path in self._sources())
+
+    def _write(self, name, content):
+        path = os.path.join(self.dist, name)
+        if os.path.exists(path):
+            return
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _copy(self, source, manifest):
+        if source not in manifest:
+            with open(os.path.join(self.static_folder, source), 'rb') as f:
+                content = f.read()
+            manifest[source] = _fingerprinted(source, content)
+            self._write(manifest[source], content)
+        return manifest[source]
+
+    def _rewrite_urls(self, source, css, manifest):
+        def replace(match):
+            url = match.group(2)
+            if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+                return match.group(0)
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(source), url.split('?')[0].split('#')[0]))
+            # Everything lands in dist/, so references become bare file names
+            return f'url({self._copy(target, manifest)})'
+        return _URL.sub(replace, css)
+
+    def build(self):
+        """Write every bundle and the manifest; returns the manifest."""
+        os.makedirs(self.dist, exist_ok=True)
+        manifest = {}
+        for name, sources in self.bundles.items():
+            chunks = []
+            for source in sources:
+                with open(os.path.join(self.static_folder, source), encoding='utf-8') as f:
+                    text = f.read()
+                if name.endswith('.css'):
+                    text = minify_css(self._rewrite_urls(source, text, manifest))
+                chunks.append(text.strip() + '\n')
+            joiner = '' if name.endswith('.css') else ';\n'
+            content = joiner.join(chunks).encode('utf-8')
+            manifest[name] = _fingerprinted(name, content)
+            self._write(manifest[name], content)
+
+        path = os.path.join(self.dist, MANIFEST)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+        self._manifest = manifest
+        return manifest
+
+    def clean(self, manifest):
+        """Delete fingerprinted files the manifest no longer lists."""
+        keep = set(manifest.values()) | {MANIFEST}
+        removed = []
+        for name in os.listdir(self.dist):
+            if name not in keep:
+                os.remove(os.path.join(self.dist, name))
+                removed.append(name)
+        return removed
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    if self.stale():
+                        self.build()
+                    else:
+                        with open(os.path.join(self.dist, MANIFEST)) as f:
+                            self._manifest = json.load(f)
+        return self._manifest
+
+    def url(self, name):
+        """URL of a bundle (``base.css``) or a source file (``vendor/inter/Inter-Regular.woff2``)."""
+        return url_for('static', filename=f'{DIST}/{self.manifest[name]}')
+
+
+def init_app(app):
+    """Add ``asset_url()`` to templates and long-lived caching for fingerprinted files."""
+    assets = Assets(app.static_folder)
+    app.jinja_env.globals['asset_url'] = assets.url
+
+    @app.after_request
+    def cache_fingerprinted(response):
+        if request.endpoint == 'static' and (request.view_args or {}).get('filename', '').startswith(f'{DIST}/') \
+                and response.status_code in (200, 304) \
+                and not request.view_args['filename'].endswith(MANIFEST):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    return assets
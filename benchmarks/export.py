@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Export benchmark.
+
+Seeds a database at each size in ``--sizes`` (with benchmarks/seed.py) and
+runs every export against it in a fresh process: the Excel report behind
+``/export_data`` and the CSV, NDJSON and Parquet table exports (all three
+tables each). Records wall time, peak RSS above the post-startup baseline,
+peak tracemalloc, output size and rows/sec, and prints the results as JSON.
+
+Each result is checked against the ceilings in ``CEILINGS`` (or a JSON file
+given with ``--ceilings``); the script exits 1 if any is exceeded. Peak
+memory ceilings are absolute, because exports are meant to stream in
+constant memory whatever the row count.
+
+Wall time and RSS come from an untraced run; tracemalloc slows Python down,
+so its peak is taken from a second run (skip it with ``--no-tracemalloc``).
+
+Usage:
+    python benchmarks/export.py [--sizes 10000,100000,1000000] [--formats xlsx,csv]
+        [--database-url postgresql://localhost/bench] [--ceilings ceilings.json] [--output run.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORMATS = ('xlsx', 'csv', 'ndjson', 'parquet')
+
+# Per format: minimum rows/sec, maximum peak RSS growth and tracemalloc peak in MB.
+# Locally xlsx runs at about 6500 rows/sec (slower at 10k rows, where openpyxl's
+# import dominates) in 27 MB RSS, and csv/ndjson at 100k+ rows/sec in under 10 MB
+CEILINGS = {
+    'xlsx': {'min_rows_per_sec': 3000, 'max_rss_growth_mb': 80, 'max_traced_mb': 40},
+    'csv': {'min_rows_per_sec': 50000, 'max_rss_growth_mb': 40, 'max_traced_mb': 20},
+    'ndjson': {'min_rows_per_sec': 40000, 'max_rss_growth_mb': 40, 'max_traced_mb': 20},
+    'parquet': {'min_rows_per_sec': 30000, 'max_rss_growth_mb': 120, 'max_traced_mb': 80},
+}
+
+PROBE = r'''
+import json, resource, sys, tempfile, time, tracemalloc
+fmt, traced = sys.argv[1], sys.argv[2] == '1'
+from app import EXPORT_TABLES, app, create_app, db, render_report
+from table_export import ExportError, stream_table
+create_app()
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+with app.app_context(), tempfile.TemporaryFile() as output:
+    if fmt != 'xlsx':
+        try:
+            streams = [stream_table(db.engine, model.__table__, fmt) for model in EXPORT_TABLES.values()]
+        except ExportError as e:
+            print(json.dumps({'skipped': str(e)}))
+            sys.exit(0)
+        rows = sum(db.session.query(db.func.count(model.id)).scalar() for model in EXPORT_TABLES.values())
+        db.session.remove()
+    baseline = rss_mb()
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if fmt == 'xlsx':
+        rows = sum(render_report(output).values())
+    else:
+        for stream in streams:
+            for chunk in stream:
+                output.write(chunk)
+    elapsed = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if traced else None
+    print(json.dumps({
+        'rows': rows,
+        'seconds': elapsed,
+        'bytes': output.tell(),
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': rss_mb(),
+        'traced_mb': traced_peak,
+    }))
+'''
+
+
+def run_probe(database_url, fmt, traced):
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=ROOT,
+               METRICS_DIR=os.path.join(tempfile.gettempdir(), 'export_bench_metrics'))
+    output = subprocess.run([sys.executable, '-c', PROBE, fmt, '1' if traced else '0'], cwd=ROOT,
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def seed(database_url, rows):
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), '--rows', str(rows),
+                    '--replace', '--database-url', database_url],
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+
+def measure(database_url, fmt, traced=True):
+    result = run_probe(database_url, fmt, traced=False)
+    if 'skipped' in result:
+        return result
+    if traced:
+        result['traced_mb'] = run_probe(database_url, fmt, traced=True)['traced_mb']
+    return {
+        'rows': result['rows'],
+        'seconds': round(result['seconds'], 3),
+        'rows_per_sec': round(result['rows'] / result['seconds']) if result['seconds'] else None,
+        'output_mb': round(result['bytes'] / 1024 / 1024, 2),
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+        'rss_growth_mb': round(result['peak_rss_mb'] - result['baseline_rss_mb'], 1),
+        'traced_mb': round(result['traced_mb'], 1) if result['traced_mb'] is not None else None,
+    }
+
+
+def check(fmt, result, ceilings):
+    """Return the ceilings ``result`` breaks, as readable strings."""
+    limits = ceilings.get(fmt, {})
+    problems = []
+    if 'min_rows_per_sec' in limits and result['rows_per_sec'] is not None \
+            and result['rows_per_sec'] < limits['min_rows_per_sec']:
+        problems.append(f"{result['rows_per_sec']} rows/sec < {limits['min_rows_per_sec']}")
+    if 'max_rss_growth_mb' in limits and result['rss_growth_mb'] > limits['max_rss_growth_mb']:
+        problems.append(f"RSS grew {result['rss_growth_mb']} MB > {limits['max_rss_growth_mb']}")
+    if 'max_traced_mb' in limits and result['traced_mb'] is not None \
+            and result['traced_mb'] > limits['max_traced_mb']:
+        problems.append(f"tracemalloc peak {result['traced_mb']} MB > {limits['max_traced_mb']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10000,100000',
+                        help='comma-separated total row counts (default: 10000,100000)')
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"comma-separated formats (default: {','.join(FORMATS)})")
+    parser.add_argument('--database-url',
+                        help='database to seed and export from; it is replaced at every size '
+                             '(default: a temporary SQLite file per size)')
+    parser.add_argument('--ceilings', help='JSON file overriding CEILINGS per format')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='skip the tracemalloc runs')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    ceilings = {fmt: dict(limits) for fmt, limits in CEILINGS.items()}
+    if args.ceilings:
+        with open(args.ceilings) as f:
+            for fmt, limits in json.load(f).items():
+                ceilings.setdefault(fmt, {}).update(limits)
+
+    formats = [fmt for fmt in args.formats.split(',') if fmt]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    scratch = tempfile.mkdtemp(prefix='export_bench_')
+    results = []
+    failures = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        database_url = args.database_url or f"sqlite:///{os.path.join(scratch, f'export_{size}.db')}"
+        seed(database_url, size)
+        for fmt in formats:
+            result = measure(database_url, fmt, traced=not args.no_tracemalloc)
+            entry = dict(size=size, format=fmt, **result)
+            if 'skipped' not in result:
+                problems = check(fmt, result, ceilings)
+                if problems:
+                    entry['failed'] = problems
+                    failures.append(entry)
+            results.append(entry)
+            print(f"{size:>8} {fmt:<8} " + (f"skipped: {result['skipped']}" if 'skipped' in result else
+                  f"{result['seconds']:>8.2f}s {result['rows_per_sec'] or 0:>9} rows/s "
+                  f"{result['output_mb']:>8.1f} MB out {result['rss_growth_mb']:>7.1f} MB RSS "
+                  f"{result['traced_mb'] if result['traced_mb'] is not None else '-':>6} MB traced"
+                  + (f"  FAIL: {'; '.join(entry['failed'])}" if entry.get('failed') else '')),
+                  file=sys.stderr)
+
+    report = {'ceilings': {fmt: ceilings[fmt] for fmt in formats if fmt in ceilings},
+              'results': results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if failures:
+        print(f'{len(failures)} export run(s) exceeded their ceilings', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+HTTP load driver.
+
+Starts the app under gunicorn (gunicorn.conf.py) against a SQLite file or a
+local PostgreSQL database, waits for ``/ready``, then replays a mixed
+read/write workload from ``--clients`` concurrent clients for ``--duration``
+seconds. Reports throughput and p50/p95/p99 latency per route as JSON,
+tagged with the git commit, so runs can be compared across commits.
+
+Writes are adds, edits and deletes through the normal routes; deletes only
+remove rows the seed created and each id at most once.
+
+Usage:
+    python benchmarks/seed.py --rows 100000 --replace --database-url sqlite:////tmp/bench.db
+    python benchmarks/load.py --database-url sqlite:////tmp/bench.db [--clients 8] [--duration 30]
+        [--workers 2] [--output run.json] [--compare previous.json]
+    python benchmarks/load.py --url http://localhost:8080 --database-url ...   # server already running
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.seed import SALE_KINDS, load_profile  # noqa: E402
+
+# Ids sampled per table for edits and deletes
+ID_SAMPLE = 2000
+
+# (route, weight); roughly what the truck's phones do in a day, reads first
+WORKLOAD = [
+    ('index', 20),
+    ('dashboard', 20),
+    ('dashboard_last_year', 4),
+    # The dashboard page fetches its monthly series and recent activity from
+    # the API after it renders, so every dashboard view costs these as well
+    ('api_series', 20),
+    ('api_series_last_year', 4),
+    ('api_activity', 24),
+    ('investments', 4),
+    ('expenses', 10),
+    ('expenses_filtered', 8),
+    ('sales', 10),
+    ('sales_last_month', 6),
+    ('edit_expense_get', 3),
+    ('add_sale', 6),
+    ('add_expense', 4),
+    ('add_investment', 1),
+    ('edit_expense', 2),
+    ('edit_sale', 1),
+    ('delete_sale', 1),
+]
+
+
+class Workload:
+    """Builds requests for the weighted route mix."""
+
+    def __init__(self, ids):
+        self.profile = load_profile()
+        self.categories = sorted({category for _, category, _ in self.profile['expenses']})
+        self.edit_ids = {table: ids[:len(ids) // 2] for table, ids in ids.items()}
+        self.delete_ids = {table: ids[len(ids) // 2:] for table, ids in ids.items()}
+        self.lock = threading.Lock()
+        self.routes = [route for route, _ in WORKLOAD]
+        self.weights = [weight for _, weight in WORKLOAD]
+
+    def _day(self, rng, back=365):
+        return (datetime.now() - timedelta(days=rng.randrange(back))).strftime('%Y-%m-%d')
+
+    def _edit_id(self, rng, table):
+        ids = self.edit_ids[table]
+        return rng.choice(ids) if ids else None
+
+    def _delete_id(self, table):
+        with self.lock:
+            ids = self.delete_ids[table]
+            return ids.pop() if ids else None
+
+    def next(self, rng):
+        """Return ``(route, method, path, json body)``; None when a route has run out of rows."""
+        route = rng.choices(self.routes, self.weights)[0]
+        today = datetime.now()
+        if route == 'index':
+            return route, 'GET', '/', None
+        if route == 'dashboard':
+            return route, 'GET', '/dashboard', None
+        if route == 'dashboard_last_year':
+            return route, 'GET', f'/dashboard?year={today.year - 1}', None
+        if route == 'api_series':
+            return route, 'GET', f'/api/v1/series?year={today.year}', None
+        if route == 'api_series_last_year':
+            return route, 'GET', f'/api/v1/series?year={today.year - 1}', None
+        if route == 'api_activity':
+            return route, 'GET', '/api/v1/activity', None
+        if route in ('investments', 'expenses', 'sales'):
+            return route, 'GET', f'/{route}', None
+        if route == 'expenses_filtered':
+            category = rng.choice(self.categories).replace(' ', '+')
+            return route, 'GET', f'/expenses?category={category}&from={self._day(rng, 730)}', None
+        if route == 'sales_last_month':
+            start = (today - timedelta(days=30)).strftime('%Y-%m-%d')
+            return route, 'GET', f'/sales?from={start}&per_page=100', None
+        if route == 'add_sale':
+            description, amount, _ = rng.choice(SALE_KINDS)
+            return route, 'POST', '/add_sale', {
+                'description': description, 'amount': str(amount), 'date': self._day(rng, 30)}
+        if route == 'add_expense':
+            description, category, amount = rng.choice(self.profile['expenses'])
+            return route, 'POST', '/add_expense', {
+                'description': description, 'category': category,
+                'amount': str(amount), 'date': self._day(rng, 30)}
+        if route == 'add_investment':
+            investor, amount = rng.choice(self.profile['investments'])
+            return route, 'POST', '/add_investment', {
+                'investor_name': investor, 'amount': str(amount), 'date': self._day(rng, 30)}
+        if route == 'edit_expense_get':
+            id = self._edit_id(rng, 'expense')
+            return id and (route, 'GET', f'/edit_expense/{id}', None)
+        if route == 'edit_expense':
+            id = self._edit_id(rng, 'expense')
+            description, category, amount = rng.choice(self.profile['expenses'])
+            return id and (route, 'POST', f'/edit_expense/{id}', {
+                'description': description, 'category': category,
+                'amount': str(amount), 'date': self._day(rng)})
+        if route == 'edit_sale':
+            id = self._edit_id(rng, 'sale')
+            description, amount, _ = rng.choice(SALE_KINDS)
+            return id and (route, 'POST', f'/edit_sale/{id}', {
+                'description': description, 'amount': str(amount), 'date': self._day(rng)})
+        if route == 'delete_sale':
+            id = self._delete_id('sale')
+            return id and (route, 'POST', f'/delete_sale/{id}', None)
+        raise ValueError(f"Unknown route '{route}'")
+
+
+def sample_ids(database_url, tables=('expense', 'sale')):
+    """A random sample of existing ids per table, split later into edit and delete pools."""
+    from sqlalchemy import create_engine, text
+    engine = create_engine(database_url.replace('postgres://', 'postgresql://', 1))
+    try:
+        with engine.connect() as connection:
+            counts = {table: connection.execute(text(f'SELECT count(*) FROM {table}')).scalar()
+                      for table in ('investment', 'expense', 'sale')}
+            ids = {table: [id for id, in connection.execute(
+                text(f'SELECT id FROM {table} ORDER BY random() LIMIT {ID_SAMPLE}'))]
+                for table in tables}
+    finally:
+        engine.dispose()
+    return ids, counts, engine.dialect.name
+
+
+def commit_id():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url, port, workers, threads):
+    scratch = tempfile.mkdtemp(prefix='load_bench_')
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port),
+               WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               METRICS_DIR=os.path.join(scratch, 'metrics'),
+               EXPORT_JOB_DIR=os.path.join(scratch, 'exports'))
+    # gunicorn's log goes to a file; a pipe nobody reads would stall the server
+    log = open(os.path.join(scratch, 'gunicorn.log'), 'w+b')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=log)
+    process.log = log
+    return process
+
+
+def request(base, method, path, body=None, timeout=60):
+    """Send one request on a fresh connection; returns ``(status, seconds)``."""
+    url = urlsplit(base)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    headers = {}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers['Content-Type'] = 'application/json'
+    started = time.perf_counter()
+    try:
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+def wait_ready(base, process=None, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            process.log.seek(0)
+            raise RuntimeError('gunicorn exited: ' + process.log.read().decode(errors='replace')[-2000:])
+        try:
+            if request(base, 'GET', '/ready', timeout=5)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'{base}/ready did not return 200 within {timeout}s')
+
+
+def client(base, workload, seed_value, stop, warm_until, results):
+    rng = random.Random(seed_value)
+    while not stop.is_set():
+        job = workload.next(rng)
+        if not job:
+            continue
+        route, method, path, body = job
+        try:
+            status, seconds = request(base, method, path, body)
+        except OSError:
+            status, seconds = None, 0.0
+        if time.monotonic() >= warm_until:
+            results.append((route, status, seconds))
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def route_stats(samples, duration):
+    latencies = sorted(seconds for status, seconds in samples if status and status < 400)
+    errors = sum(1 for status, _ in samples if not status or status >= 400)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / duration, 2),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+def compare(report, previous):
+    """Relative change in throughput and p95 per route against an earlier report."""
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return f'{(new - old) / old:+.1%}'
+
+    changes = {}
+    for route, stats in report['routes'].items():
+        old = previous['routes'].get(route)
+        if old:
+            changes[route] = {'throughput': change(stats['throughput_rps'], old['throughput_rps']),
+                              'p95': change(stats['p95_ms'], old['p95_ms'])}
+    return {'commit': previous.get('commit'), 'routes': changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database-url', required=True,
+                        help='database the server uses (fill it with benchmarks/seed.py first)')
+    parser.add_argument('--url', help='benchmark a server that is already running instead of starting one')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: 2)')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker (default: 1)')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients (default: 8)')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds (default: 30)')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds first (default: 5)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the request mix')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    ids, rows, dialect = sample_ids(args.database_url)
+    process = None
+    base = args.url
+    if base is None:
+        base = f'http://127.0.0.1:{free_port()}'
+        process = start_server(args.database_url, urlsplit(base).port, args.workers, args.threads)
+    try:
+        wait_ready(base, process)
+        workload = Workload(ids)
+        stop = threading.Event()
+        results = []
+        warm_until = time.monotonic() + args.warmup
+        clients = [threading.Thread(target=client, daemon=True,
+                                    args=(base, workload, args.seed + n, stop, warm_until, results))
+                   for n in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        time.sleep(args.warmup + args.duration)
+        stop.set()
+        for thread in clients:
+            thread.join()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    by_route = defaultdict(list)
+    for route, status, seconds in results:
+        by_route[route].append((status, seconds))
+    report = {
+        'commit': commit_id(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'database': dialect,
+        'rows': rows,
+        'config': {'workers': args.workers if process else None, 'threads': args.threads if process else None,
+                   'clients': args.clients, 'duration_s': args.duration, 'seed': args.seed},
+        'total': route_stats([(status, seconds) for _, status, seconds in results], args.duration),
+        'routes': {route: route_stats(samples, args.duration) for route, samples in sorted(by_route.items())},
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['compared_to'] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarks.
+
+Fills DATABASE_URL with investment, expense and sale histories of any size
+(10k to 1M rows is the intended range). Rows are modelled on
+``local_data_export.json``: investors and expense categories keep the
+export's mix, descriptions come from the same shops and amounts are the
+export's amounts with some jitter. The export has no sales, so sales are
+daily takings and event bookings. Dates are spread over ``--days`` of history
+ending today. Output is deterministic for a given ``--seed``.
+
+Rows are inserted in batches (COPY on PostgreSQL, executemany on SQLite) and
+the running-totals ledger is rebuilt at the end.
+
+Usage:
+    python benchmarks/seed.py --rows 100000 [--replace] [--database-url sqlite:////tmp/bench.db]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_SOURCE = os.path.join(ROOT, 'local_data_export.json')
+
+# Share of the requested rows that goes to each table
+SHARES = {'investments': 0.02, 'expenses': 0.38, 'sales': 0.60}
+
+# Sales are not in the export; (description, typical amount, weight)
+SALE_KINDS = [
+    ('Daily takings', 420.0, 70),
+    ('Lunch service', 260.0, 15),
+    ('Weekend market', 780.0, 8),
+    ('Event catering', 1500.0, 5),
+    ('Private booking', 950.0, 2),
+]
+
+BATCH_SIZE = 10000
+
+
+def load_profile(path=PROFILE_SOURCE):
+    """Template records per table from a JSON export."""
+    with open(path, encoding='utf-8') as f:
+        export = json.load(f)
+    return {
+        'investments': [(r['investor_name'], float(r['amount'])) for r in export['investments']],
+        'expenses': [(r['description'], r['category'], float(r['amount'])) for r in export['expenses']],
+    }
+
+
+def _amount(rng, typical):
+    return round(max(0.5, typical * rng.lognormvariate(0, 0.35)), 2)
+
+
+def generate(table, count, rng, profile, start, end):
+    """Yield ``count`` row dicts for ``table`` dated between ``start`` and ``end``."""
+    span = int((end - start).total_seconds())
+
+    def when():
+        return start + timedelta(seconds=rng.randrange(span))
+
+    if table == 'investments':
+        for _ in range(count):
+            investor, amount = rng.choice(profile['investments'])
+            yield {'investor_name': investor, 'amount': _amount(rng, amount), 'date': when()}
+    elif table == 'expenses':
+        for _ in range(count):
+            description, category, amount = rng.choice(profile['expenses'])
+            yield {'description': description, 'category': category,
+                   'amount': _amount(rng, amount), 'date': when()}
+    elif table == 'sales':
+        weights = [weight for _, _, weight in SALE_KINDS]
+        for _ in range(count):
+            description, amount, _ = rng.choices(SALE_KINDS, weights)[0]
+            yield {'description': description, 'amount': _amount(rng, amount), 'date': when()}
+    else:
+        raise ValueError(f"Unknown table '{table}'")
+
+
+def table_counts(rows):
+    """Split a total row count over the tables by ``SHARES``."""
+    counts = {name: int(rows * share) for name, share in SHARES.items()}
+    counts['sales'] += rows - sum(counts.values())
+    return counts
+
+
+def seed(rows, replace=False, days=3 * 365, seed_value=1, out=sys.stdout):
+    """Insert ``rows`` generated rows into the app's database; returns rows per table."""
+    # Imported here so callers can point DATABASE_URL at a benchmark database first
+    import ledger
+    from app import app, db, init_db, Investment, Expense, Sale
+    from ingest import insert_rows
+
+    models = {'investments': Investment, 'expenses': Expense, 'sales': Sale}
+    rng = random.Random(seed_value)
+    profile = load_profile()
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    counts = table_counts(rows)
+
+    init_db()
+    with app.app_context():
+        if replace:
+            with db.engine.begin() as connection:
+                for model in models.values():
+                    connection.execute(model.__table__.delete())
+        for name, count in counts.items():
+            started = time.monotonic()
+            rows_left = generate(name, count, rng, profile, start, end)
+            for offset in range(0, count, BATCH_SIZE):
+                batch = [next(rows_left) for _ in range(min(BATCH_SIZE, count - offset))]
+                with db.engine.begin() as connection:
+                    insert_rows(connection, models[name].__table__, batch)
+            elapsed = time.monotonic() - started
+            print(f'{name.capitalize()}: {count} rows in {elapsed:.1f}s', file=out)
+        ledger.rebuild(db.session)
+        db.session.remove()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=10000, help='total rows over all tables')
+    parser.add_argument('--days', type=int, default=3 * 365, help='days of history to spread rows over')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--replace', action='store_true',
+                        help='delete existing investments, expenses and sales first')
+    parser.add_argument('--database-url', help='database to fill (default: DATABASE_URL)')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    sys.path.insert(0, ROOT)
+    seed(args.rows, replace=args.replace, days=args.days, seed_value=args.seed)
+
+
+if __name__ == '__main__':
+    main()
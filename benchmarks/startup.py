@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Worker startup benchmark.
+
+Starts fresh Python processes and times each startup phase: importing
+``app``, ``create_app()`` (schema init and ledger check) and the first
+request to ``/``. Also records peak RSS and whether the heavy export
+libraries were imported. Prints medians over ``--runs`` as JSON.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--database-url sqlite:////tmp/bench.db]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app()
+initialised = time.perf_counter()
+response = application.test_client().get('/')
+first_request = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_s': imported - started,
+    'create_app_s': initialised - imported,
+    'first_request_s': first_request - initialised,
+    'total_s': first_request - started,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': sorted(m for m in ('openpyxl', 'pandas', 'numpy', 'pyarrow') if m in sys.modules),
+}))
+'''
+
+
+def run_once(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url',
+                        default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'startup_bench.db')}")
+    args = parser.parse_args()
+
+    # The first run creates the schema; it is reported separately
+    cold = run_once(args.database_url)
+    runs = [run_once(args.database_url) for _ in range(args.runs)]
+    phases = ('import_s', 'create_app_s', 'first_request_s', 'total_s', 'peak_rss_mb')
+    print(json.dumps({
+        'runs': args.runs,
+        'first_start': {phase: round(cold[phase], 4) for phase in phases},
+        'median': {phase: round(statistics.median(run[phase] for run in runs), 4) for phase in phases},
+        'heavy_modules': runs[-1]['heavy_modules'],
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-worker memoization of computed summaries, invalidated by data version.
+
+Each gunicorn worker keeps its own bounded LRU of results. Entries are keyed
+on the shared data version (see ``ledger.data_version``), which every write
+bumps in the database, so all workers drop stale results as soon as any of
+them commits a change. Entries also expire after a TTL.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+class SummaryCache:
+    def __init__(self, version_func, maxsize=256, ttl=300):
+        self.version_func = version_func
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key`` at the current data version."""
+        key = (self.version_func(), key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._evict(now)
+        return value
+
+    def _evict(self, now):
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self.evictions += len(expired)
+
+    def memoize(self, func):
+        """Decorator caching ``func(*args)`` per data version."""
+        @functools.wraps(func)
+        def wrapper(*args):
+            return self.get_or_compute((func.__name__, args), lambda: func(*args))
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,177 @@
+"""
+Database connection pool configuration and live pool statistics.
+
+PostgreSQL is reached through a TCP proxy that silently drops idle
+connections, so pooled connections are pinged before use and recycled well
+before the proxy timeout. Pool sizes default to what one gunicorn worker can
+use at once (one connection per request thread, plus headroom for background
+exports), optionally capped so ``workers * (pool_size + max_overflow)`` stays
+within ``DB_MAX_CONNECTIONS``.
+
+With ``DB_PGBOUNCER=1`` connections are not pooled in the app at all
+(PgBouncer does that), and the statement timeout is set per transaction with
+``SET LOCAL`` because PgBouncer in transaction mode rejects startup options.
+
+SQLite keeps Flask-SQLAlchemy's defaults.
+"""
+import os
+import shlex
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def gunicorn_setting(name, env=None):
+    """Read a gunicorn option (``workers``/``threads``) from the environment."""
+    env = os.environ if env is None else env
+    variable = {'workers': 'WEB_CONCURRENCY', 'threads': 'GUNICORN_THREADS'}[name]
+    if env.get(variable):
+        return int(env[variable])
+    args = shlex.split(env.get('GUNICORN_CMD_ARGS', ''))
+    for i, arg in enumerate(args):
+        if arg == f'--{name}' and i + 1 < len(args):
+            return int(args[i + 1])
+        if arg.startswith(f'--{name}='):
+            return int(arg.split('=', 1)[1])
+    return 1
+
+
+class PoolStats:
+    """Counters updated from pool events, shared by every pool in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.invalidated = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidated': self.invalidated,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+            }
+
+
+stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def settings(env=None):
+    """Pool settings from ``DB_*`` variables, defaulting from the gunicorn config."""
+    env = os.environ if env is None else env
+    workers = gunicorn_setting('workers', env)
+    threads = gunicorn_setting('threads', env)
+    export_threads = int(env.get('EXPORT_JOB_THREADS', 2))
+
+    pool_size = int(env.get('DB_POOL_SIZE', threads))
+    max_overflow = int(env.get('DB_MAX_OVERFLOW', export_threads + 1))
+    if env.get('DB_MAX_CONNECTIONS'):
+        per_worker = max(1, int(env['DB_MAX_CONNECTIONS']) // workers)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': float(env.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(env.get('DB_POOL_RECYCLE', 280)),
+        'pool_pre_ping': _flag(env.get('DB_POOL_PRE_PING', '1')),
+        'statement_timeout': int(env.get('DB_STATEMENT_TIMEOUT', 30000)),
+        'pgbouncer': _flag(env.get('DB_PGBOUNCER', '0')),
+    }
+
+
+def engine_options(database_url, config):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``database_url`` and ``settings()``."""
+    if not database_url.startswith('postgresql'):
+        return {}
+    if config['pgbouncer']:
+        return {'poolclass': NullPool}
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['pool_size'],
+        'max_overflow': config['max_overflow'],
+        'pool_timeout': config['pool_timeout'],
+        'pool_recycle': config['pool_recycle'],
+        'pool_pre_ping': config['pool_pre_ping'],
+    }
+    if config['statement_timeout']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['statement_timeout']}"}
+    return options
+
+
+def install(engine, config):
+    """Attach the statistics listeners (and PgBouncer's statement timeout)."""
+    event.listen(engine, 'connect', lambda *args: stats.count('connects'))
+    event.listen(engine, 'checkout', lambda *args: stats.count('checkouts'))
+    event.listen(engine, 'invalidate', lambda *args: stats.count('invalidated'))
+
+    if engine.dialect.name == 'postgresql' and config['pgbouncer'] and config['statement_timeout']:
+        timeout = int(config['statement_timeout'])
+
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout}')
+
+
+def pool_status(engine):
+    """Live pool occupancy plus the event counters."""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    status.update(stats.snapshot())
+    return status
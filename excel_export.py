@@ -0,0 +1,219 @@
+"""
+Streaming Excel report writer.
+
+Rows are read from the database in chunks and appended to a write-only
+openpyxl workbook, which spools each sheet to a temporary file instead of
+keeping cell objects in memory. Formatting uses named styles shared by every
+cell, so peak memory stays flat as the tables grow.
+"""
+import warnings
+from datetime import datetime
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+import readonly
+
+CURRENCY_FORMAT = '"£"#,##0.00'
+
+_thin = Side(style='thin')
+BORDER = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+HEADER_FILL = PatternFill(start_color="2F75B5", end_color="2F75B5", fill_type="solid")
+CURRENCY_FILL = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+TITLE_FILL = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+
+STYLES = {
+    'lk_header': dict(font=Font(bold=True, color="FFFFFF"), fill=HEADER_FILL,
+                      alignment=Alignment(horizontal="center"), border=BORDER),
+    'lk_plain_header': dict(font=Font(bold=True), alignment=Alignment(horizontal="center"),
+                            border=BORDER),
+    'lk_cell': dict(border=BORDER),
+    'lk_currency': dict(number_format=CURRENCY_FORMAT, fill=CURRENCY_FILL, border=BORDER),
+    'lk_percent': dict(number_format='0.0%', border=BORDER),
+    'lk_title': dict(font=Font(bold=True, size=16, color="FFFFFF"), fill=TITLE_FILL,
+                     alignment=Alignment(horizontal="center"), border=BORDER),
+    'lk_subtitle': dict(font=Font(italic=True, size=10), border=BORDER),
+    'lk_section': dict(font=Font(bold=True, size=12, color="FFFFFF"), fill=HEADER_FILL,
+                       border=BORDER),
+}
+
+# Summary sheet layout, by spreadsheet row number (row 1 is the header row)
+SUMMARY_SECTION_ROWS = {4, 11, 20, 26, 34}
+SUMMARY_CURRENCY_ROWS = {5, 6, 7, 8, 13, 14, 15, 16, 22, 23, 25, 26, 27, 28, 29, 35, 36, 37, 38}
+SUMMARY_PERCENT_ROWS = {9, 30}
+
+
+def _register_styles(workbook):
+    for name, attrs in STYLES.items():
+        style = NamedStyle(name=name, font=DEFAULT_FONT)
+        for attr, value in attrs.items():
+            setattr(style, attr, value)
+        workbook.add_named_style(style)
+
+
+def _cell(sheet, value, style):
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.style = style
+    return cell
+
+
+def _write_table_sheet(workbook, title, table_name, columns, rows):
+    """
+    Stream ``rows`` into a new sheet.
+
+    ``columns`` is a list of ``(header, width, is_currency)``. Returns the
+    number of data rows written.
+    """
+    sheet = workbook.create_sheet(title)
+    for index, (_, width, _) in enumerate(columns):
+        sheet.column_dimensions[chr(ord('A') + index)].width = width
+
+    sheet.append([_cell(sheet, header, 'lk_header') for header, _, _ in columns])
+    styles = ['lk_currency' if is_currency else 'lk_cell' for _, _, is_currency in columns]
+
+    count = 0
+    for row in rows:
+        sheet.append([_cell(sheet, value, style) for value, style in zip(row, styles)])
+        count += 1
+
+    if count:
+        last_column = chr(ord('A') + len(columns) - 1)
+        table = Table(displayName=table_name, ref=f"A1:{last_column}{count + 1}")
+        # Write-only sheets cannot read the header cells back, so name the columns here
+        for index, (header, _, _) in enumerate(columns, start=1):
+            table.tableColumns.append(TableColumn(id=index, name=header))
+        table.tableStyleInfo = TableStyleInfo(
+            name="TableStyleMedium9", showFirstColumn=False,
+            showLastColumn=False, showRowStripes=True, showColumnStripes=False)
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='In write-only mode')
+            sheet.add_table(table)
+    return count
+
+
+def summary_rows(figures, expense_categories, now=None):
+    """The Complete Summary sheet contents as ``[label, value]`` pairs."""
+    now = now or datetime.now()
+    total_investment = figures['total_investment']
+    total_expenses = figures['total_expenses']
+    total_sales = figures['total_sales']
+    investment_count = figures['investment_count']
+    expense_count = figures['expense_count']
+    sale_count = figures['sale_count']
+    net_profit = total_sales - total_expenses
+    shree_investment = figures['investors'].get('Shree', 0.0)
+    adwait_investment = figures['investors'].get('Adwait', 0.0)
+
+    rows = [
+        ['London\'s Kitchen - Complete Financial Report', ''],
+        [f'Generated on: {now.strftime("%d/%m/%Y %H:%M")}', ''],
+        ['', ''],
+        ['📊 BUSINESS OVERVIEW', ''],
+        ['Total Investments', total_investment],
+        ['Total Expenses', total_expenses],
+        ['Total Sales Revenue', total_sales],
+        ['Net Profit/Loss', net_profit],
+        ['Profit Margin', f"{(net_profit/total_sales*100):.1f}%" if total_sales > 0 else "0.0%"],
+        ['', ''],
+        ['💰 INVESTMENT ANALYSIS', ''],
+        ['Total Number of Investments', investment_count],
+        ['Average Investment Amount', total_investment/investment_count if investment_count else 0],
+        ['Adwait\'s Total Investment', adwait_investment],
+        ['Shree\'s Total Investment', shree_investment],
+        ['Adwait\'s Investment %', f"{(adwait_investment/total_investment*100):.1f}%" if total_investment > 0 else "0.0%"],
+        ['Shree\'s Investment %', f"{(shree_investment/total_investment*100):.1f}%" if total_investment > 0 else "0.0%"],
+        ['', ''],
+        ['💸 EXPENSE ANALYSIS', ''],
+        ['Total Number of Expenses', expense_count],
+        ['Average Expense Amount', total_expenses/expense_count if expense_count else 0],
+        ['', ''],
+        ['Expense Categories Breakdown:', ''],
+    ]
+
+    for category, amount in sorted(expense_categories.items(), key=lambda x: x[1], reverse=True):
+        rows.append([f"  {category}", amount])
+
+    rows.extend([
+        ['', ''],
+        ['💵 SALES ANALYSIS', ''],
+        ['Total Number of Sales', sale_count],
+        ['Average Sale Amount', total_sales/sale_count if sale_count else 0],
+        ['', ''],
+        ['📈 PROFIT DISTRIBUTION', ''],
+        ['Available for Distribution', net_profit],
+        ['Adwait\'s Profit Share', f"£{net_profit * (adwait_investment/total_investment):,.2f}" if total_investment > 0 else "£0.00"],
+        ['Shree\'s Profit Share', f"£{net_profit * (shree_investment/total_investment):,.2f}" if total_investment > 0 else "£0.00"],
+        ['', ''],
+        ['🔍 DATA SUMMARY', ''],
+        ['Total Records in System', investment_count + expense_count + sale_count],
+        ['Data Export Date', now.strftime('%d/%m/%Y')],
+        ['Data Export Time', now.strftime('%H:%M:%S')],
+    ])
+    return rows
+
+
+def _write_summary_sheet(workbook, rows):
+    sheet = workbook.create_sheet('Complete Summary')
+    sheet.column_dimensions['A'].width = 40
+    sheet.column_dimensions['B'].width = 25
+
+    sheet.append([_cell(sheet, 'Category', 'lk_title'), _cell(sheet, 'Amount', 'lk_plain_header')])
+    for number, (label, value) in enumerate(rows, start=2):
+        if number == 2:
+            label_style = 'lk_subtitle'
+        elif number in SUMMARY_SECTION_ROWS:
+            label_style = 'lk_section'
+        else:
+            label_style = 'lk_cell'
+
+        if number in SUMMARY_CURRENCY_ROWS:
+            value_style = 'lk_currency'
+        elif number in SUMMARY_PERCENT_ROWS:
+            value_style = 'lk_percent'
+        else:
+            value_style = 'lk_cell'
+
+        sheet.append([_cell(sheet, label or None, label_style),
+                      _cell(sheet, None if value == '' else value, value_style)])
+
+
+def write_report(fileobj, session, investment, expense, sale, figures, expense_categories):
+    """
+    Write the complete report workbook to ``fileobj``.
+
+    ``figures`` and ``expense_categories`` feed the summary sheet (see
+    ``summary_rows``). Returns the number of data rows written per sheet.
+    """
+    workbook = Workbook(write_only=True)
+    _register_styles(workbook)
+
+    investments = readonly.stream(readonly.rows(session, investment).order_by(investment.id))
+    expenses = readonly.stream(readonly.rows(session, expense).order_by(expense.id))
+    sales = readonly.stream(readonly.rows(session, sale).order_by(sale.id))
+
+    counts = {}
+    counts['Investments'] = _write_table_sheet(
+        workbook, 'Investments', 'InvestmentsTable',
+        [('Date', 12, False), ('Investor', 20, False), ('Amount', 15, True),
+         ('Investment ID', 12, False)],
+        ((i.date.strftime('%Y-%m-%d'), i.investor_name, i.amount, f"INV-{i.id:03d}")
+         for i in investments))
+    counts['Expenses'] = _write_table_sheet(
+        workbook, 'Expenses', 'ExpensesTable',
+        [('Date', 12, False), ('Description', 35, False), ('Category', 20, False),
+         ('Amount', 15, True), ('Expense ID', 12, False)],
+        ((e.date.strftime('%Y-%m-%d'), e.description, e.category, e.amount, f"EXP-{e.id:03d}")
+         for e in expenses))
+    counts['Sales'] = _write_table_sheet(
+        workbook, 'Sales', 'SalesTable',
+        [('Date', 12, False), ('Description', 35, False), ('Amount', 15, True),
+         ('Sale ID', 12, False)],
+        ((s.date.strftime('%Y-%m-%d'), s.description, s.amount, f"SAL-{s.id:03d}")
+         for s in sales))
+
+    _write_summary_sheet(workbook, summary_rows(figures, expense_categories))
+    workbook.save(fileobj)
+    return counts
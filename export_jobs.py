@@ -0,0 +1,156 @@
+"""
+Background export jobs.
+
+A job renders a report into a file on local disk from a small thread pool
+inside the worker that accepted it. Job state lives next to the output as a
+JSON file, so any gunicorn worker on the same instance can answer status and
+download requests. The number of exports running at once on the instance is
+capped with ``flock``-ed slot files, which the kernel releases if a worker
+dies mid-export.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_job_id = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ExportJobs:
+    def __init__(self, directory, suffix='.xlsx', max_workers=2, max_concurrent=1,
+                 ttl=3600, poll_interval=0.5, cleanup_interval=60, logger=None):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_concurrent = max_concurrent
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self.poll_interval = poll_interval
+        self.logger = logger
+        self._max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._cleaned = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _pool(self):
+        # Created lazily, and again after a fork, so a preloaded app hands each
+        # worker its own threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix='export-job')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _state_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def output_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}{self.suffix}')
+
+    def _write_state(self, job_id, **state):
+        path = self._state_path(job_id)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def _remove(self, job_id):
+        for path in (self._state_path(job_id), self.output_path(job_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def expired(self, state):
+        """Whether a job finished (or, if it never did, was created) more than the TTL ago."""
+        return time.time() - state.get('finished', state['created']) > self.ttl
+
+    def status(self, job_id):
+        """Job state dict, or None for an unknown or expired job."""
+        # Status and download polls also sweep old jobs, so files don't wait
+        # for the next submit to be deleted
+        if time.time() - self._cleaned > self.cleanup_interval:
+            self.cleanup()
+        if not _job_id.match(job_id or ''):
+            return None
+        try:
+            with open(self._state_path(job_id)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.expired(state):
+            self._remove(job_id)
+            return None
+        return state
+
+    def submit(self, task, **meta):
+        """
+        Queue ``task(fileobj)`` to write a report and return the job id.
+
+        ``meta`` is stored with the job state (e.g. the download file name).
+        """
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        state = dict(meta, id=job_id, status=QUEUED, created=time.time())
+        self._write_state(job_id, **state)
+        self._pool().submit(self._run, job_id, task, state)
+        return job_id
+
+    def _acquire_slot(self):
+        """Block until one of the instance-wide export slots is free."""
+        while True:
+            for slot in range(self.max_concurrent):
+                handle = open(os.path.join(self.directory, f'.slot-{slot}.lock'), 'a')
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return handle
+                except OSError:
+                    handle.close()
+            time.sleep(self.poll_interval)
+
+    def _run(self, job_id, task, state):
+        slot = self._acquire_slot()
+        try:
+            started = time.time()
+            self._write_state(job_id, **dict(state, status=RUNNING, started=started))
+            partial = f'{self.output_path(job_id)}.part'
+            with open(partial, 'wb') as f:
+                task(f)
+            os.replace(partial, self.output_path(job_id))
+            self._write_state(job_id, **dict(
+                state, status=DONE, started=started, finished=time.time(),
+                size=os.path.getsize(self.output_path(job_id))))
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Export job {job_id} failed: {traceback.format_exc()}")
+            self._write_state(job_id, **dict(state, status=FAILED, error=str(e),
+                                             finished=time.time()))
+        finally:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
+
+    def cleanup(self):
+        """Delete the state and output files of jobs older than the TTL."""
+        self._cleaned = time.time()
+        cutoff = self._cleaned - self.ttl
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
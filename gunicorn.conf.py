@@ -0,0 +1,37 @@
+# Gunicorn settings; db_pool.py sizes each worker's connection pool from the
+# same WEB_CONCURRENCY / GUNICORN_THREADS variables.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Import and initialise the app once in the master; workers share its memory
+# copy-on-write instead of each importing Flask, SQLAlchemy and the models
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes', 'on')
+wsgi_app = 'app:create_app()'
+
+
+def on_starting(server):
+    # /metrics and /admin/slow_queries sum the snapshots in METRICS_DIR; start
+    # from zero on each run
+    import metrics
+    metrics.clear(metrics.default_directory())
+    metrics.clear(metrics.default_directory(), prefix='slow-queries-')
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # Connections opened by the master during init must not be shared
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Runs before the worker accepts connections: fill the pool, compile the
+    # templates and prime the summary cache so no user hits a cold worker
+    from app import warm_up
+    state = warm_up()
+    if state.error:
+        worker.log.warning('Warm-up incomplete, /ready will retry: %s', state.error)
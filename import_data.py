@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Import investments, expenses and sales from a JSON export into DATABASE_URL.
+
+Replaces the old per-row import scripts. The export file (the format written
+by export_local_data.py) is parsed incrementally, records are validated and
+inserted in batches (COPY on PostgreSQL, executemany on SQLite) by one thread
+per table, and progress is checkpointed in the database in the same
+transaction as each batch. Re-running after an interruption resumes where the
+last committed batch ended; re-running a finished import is a no-op.
+
+Usage:
+    python import_data.py [local_data_export.json] [--batch-size 1000] [--replace]
+    railway run python import_data.py --replace
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+
+import ledger
+from app import app, db, init_db, Investment, Expense, Sale
+from ingest import insert_rows, validate
+
+TABLES = {'investments': Investment, 'expenses': Expense, 'sales': Sale}
+
+checkpoints = Table(
+    'import_checkpoint', MetaData(),
+    Column('source', String(300), primary_key=True),
+    Column('table_name', String(50), primary_key=True),
+    Column('records', Integer, nullable=False, default=0),
+)
+
+READ_SIZE = 64 * 1024
+_done = object()
+
+
+class ExportReader:
+    """
+    Incremental parser for ``{"investments": [...], "expenses": [...], ...}``.
+
+    Yields ``(section, record)`` pairs while holding only a small window of the
+    file in memory. Top-level values that are not arrays are skipped.
+    """
+
+    def __init__(self, fileobj):
+        self.file = fileobj
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.file.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError('unexpected end of file')
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number may continue past the buffered window
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                self.pos += 1
+                if self._peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._peek() == ',':
+                            self.pos += 1
+                            continue
+                        self._expect(']')
+                        break
+            else:
+                self._value()
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect('}')
+            return
+
+
+class TableImporter(threading.Thread):
+    """Consumes one table's records and commits them in batches."""
+
+    def __init__(self, source, name, model, skip, batch_size, write_lock):
+        super().__init__(name=f'import-{name}', daemon=True)
+        self.source = source
+        self.table_name = name
+        self.model = model
+        self.skip = skip
+        self.batch_size = batch_size
+        self.write_lock = write_lock
+        self.records = queue.Queue(maxsize=batch_size * 4)
+        self.position = skip
+        self.inserted = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self.failure = None
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            batch = []
+            while True:
+                record = self.records.get()
+                if record is _done:
+                    break
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self._commit(batch)
+                    batch = []
+            self._commit(batch)
+        except Exception as e:
+            self.failure = e
+            # Keep draining so the reader never blocks on a dead consumer
+            while self.records.get() is not _done:
+                pass
+        finally:
+            self.elapsed = time.monotonic() - started
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        table = self.model.__table__
+        rows = []
+        for offset, record in enumerate(batch, start=1):
+            try:
+                rows.append(validate(table, record))
+            except ValueError as e:
+                self.errors.append((self.position + offset, str(e)))
+
+        with self.write_lock, app.app_context(), db.engine.begin() as connection:
+            insert_rows(connection, table, rows)
+            ledger.apply_deltas(connection, ledger.row_deltas(ledger.key_for(self.model), rows))
+            save_checkpoint(connection, self.source, self.table_name, self.position + len(batch))
+
+        self.position += len(batch)
+        self.inserted += len(rows)
+
+
+def load_checkpoints(connection, source):
+    rows = connection.execute(
+        select(checkpoints.c.table_name, checkpoints.c.records)
+        .where(checkpoints.c.source == source))
+    return {name: records for name, records in rows}
+
+
+def save_checkpoint(connection, source, name, records):
+    updated = connection.execute(
+        checkpoints.update()
+        .where(checkpoints.c.source == source, checkpoints.c.table_name == name)
+        .values(records=records))
+    if updated.rowcount == 0:
+        connection.execute(checkpoints.insert().values(source=source, table_name=name, records=records))
+
+
+def replace_existing(connection, source):
+    """Delete all rows and this source's checkpoints before a fresh import."""
+    for model in TABLES.values():
+        connection.execute(model.__table__.delete())
+    connection.execute(checkpoints.delete().where(checkpoints.c.source == source))
+
+
+def run_import(path, batch_size=1000, replace=False, out=sys.stdout):
+    source = f'{os.path.basename(path)}:{os.path.getsize(path)}'
+    init_db()
+
+    with app.app_context():
+        engine = db.engine
+        checkpoints.create(engine, checkfirst=True)
+        with engine.begin() as connection:
+            if replace:
+                print('Clearing existing data...', file=out)
+                replace_existing(connection, source)
+            done = load_checkpoints(connection, source)
+        if replace:
+            ledger.rebuild(db.session)
+        # SQLite allows a single writer, so batches take turns there
+        write_lock = threading.Lock() if engine.dialect.name == 'sqlite' else nullcontext()
+
+    if any(done.values()):
+        print('Resuming: ' + ', '.join(f'{name} from record {count + 1}'
+                                       for name, count in done.items()), file=out)
+
+    importers = {name: TableImporter(source, name, model, done.get(name, 0), batch_size, write_lock)
+                 for name, model in TABLES.items()}
+    for importer in importers.values():
+        importer.start()
+
+    started = time.monotonic()
+    seen = dict.fromkeys(TABLES, 0)
+    try:
+        with open(path, encoding='utf-8') as f:
+            for section, record in ExportReader(f):
+                importer = importers.get(section)
+                if importer is None:
+                    continue
+                seen[section] += 1
+                if seen[section] > importer.skip:
+                    importer.records.put(record)
+    finally:
+        for importer in importers.values():
+            importer.records.put(_done)
+        for importer in importers.values():
+            importer.join()
+    elapsed = time.monotonic() - started
+
+    total = 0
+    for name, importer in importers.items():
+        total += importer.inserted
+        rate = importer.inserted / importer.elapsed if importer.elapsed else 0
+        print(f'{name.capitalize()}: {importer.inserted} inserted, {len(importer.errors)} rejected, '
+              f'{rate:,.0f} rows/sec', file=out)
+        for position, error in importer.errors[:10]:
+            print(f'  record {position}: {error}', file=out)
+        if importer.failure:
+            print(f'  FAILED: {importer.failure} (re-run to resume from record '
+                  f'{importer.position + 1})', file=out)
+    print(f'Total: {total} rows in {elapsed:.2f}s '
+          f'({total / elapsed if elapsed else 0:,.0f} rows/sec)', file=out)
+    return importers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='?', default='local_data_export.json',
+                        help='JSON export to import (default: local_data_export.json)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='records per transaction (default: 1000)')
+    parser.add_argument('--replace', action='store_true',
+                        help='delete existing investments, expenses and sales first')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Data file {args.path} not found!")
+        sys.exit(1)
+
+    importers = run_import(args.path, batch_size=args.batch_size, replace=args.replace)
+    if any(importer.failure for importer in importers.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
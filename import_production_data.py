@@ -8,7 +8,8 @@ import json
 import os
 import sys
 from datetime import datetime
-from app import app, db, Investment, Expense, Sale
+import ledger
+from app import app, db, init_db, Investment, Expense, Sale
 
 def import_data():
     """Import data from JSON file to production database"""
@@ -25,6 +26,7 @@ def import_data():
     
     print(f"Importing data exported on: {data.get('exported_at', 'Unknown')}")
     
+    init_db()
     with app.app_context():
         # Clear existing data (optional - comment out if you want to append)
         print("Clearing existing data...")
@@ -66,6 +68,8 @@ def import_data():
         
         # Commit all changes
         db.session.commit()
+        # The bulk deletes above bypass the ledger hook, so recompute it
+        ledger.rebuild(db.session)
         print("Data import completed successfully!")
         
         # Show summary
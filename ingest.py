@@ -0,0 +1,167 @@
+"""
+Bulk ingest of investments, expenses and sales.
+
+Records arrive as a JSON array, NDJSON or CSV, are validated against the
+table's columns, and the valid ones are inserted in a single transaction:
+``COPY ... FROM STDIN`` on PostgreSQL, one executemany INSERT elsewhere.
+Invalid records are reported back by position instead of failing the batch.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, Integer, String
+
+
+class PayloadError(Exception):
+    """The request body could not be read as any supported format."""
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        try:
+            parsed = datetime.strptime(text, '%Y-%m-%d')
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(text)
+            except ValueError:
+                raise ValueError(f"invalid date '{value}', expected YYYY-MM-DD")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid amount '{value}'")
+    if not math.isfinite(amount):
+        raise ValueError(f"invalid amount '{value}'")
+    return amount
+
+
+def input_columns(table):
+    """The columns a client supplies: everything except the primary key."""
+    return [column for column in table.columns if not column.primary_key]
+
+
+def validate(table, record):
+    """Return a clean row dict for ``record`` or raise ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+    row = {}
+    for column in input_columns(table):
+        value = record.get(column.name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            if not column.nullable:
+                raise ValueError(f"missing required field '{column.name}'")
+            row[column.name] = None
+            continue
+        if isinstance(column.type, DateTime):
+            value = _parse_date(value)
+        elif isinstance(column.type, Float):
+            value = _parse_amount(value)
+        elif isinstance(column.type, Integer):
+            value = int(value)
+        elif isinstance(column.type, String):
+            value = str(value)
+            if column.type.length and len(value) > column.type.length:
+                raise ValueError(f"'{column.name}' is longer than {column.type.length} characters")
+        row[column.name] = value
+    return row
+
+
+def parse_records(body, content_type):
+    """
+    Yield ``(position, record_or_error)`` from a request body.
+
+    ``position`` is the 1-based record number (data line for NDJSON/CSV). A
+    record that cannot be decoded is yielded as a ValueError.
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if isinstance(body, bytes):
+        try:
+            body = body.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise PayloadError('body must be UTF-8 encoded')
+
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+        position = 0
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            position += 1
+            try:
+                yield position, json.loads(line)
+            except ValueError as e:
+                yield position, ValueError(f'invalid JSON: {e}')
+        return
+
+    if content_type in ('text/csv', 'application/csv'):
+        reader = csv.DictReader(io.StringIO(body))
+        for position, record in enumerate(reader, start=1):
+            yield position, record
+        return
+
+    try:
+        records = json.loads(body)
+    except ValueError as e:
+        raise PayloadError(f'invalid JSON: {e}')
+    if not isinstance(records, list):
+        raise PayloadError('expected a JSON array of records')
+    for position, record in enumerate(records, start=1):
+        yield position, record
+
+
+def _csv_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def insert_rows(connection, table, rows):
+    """Insert validated rows with COPY on PostgreSQL or one executemany."""
+    if not rows:
+        return
+    names = [column.name for column in input_columns(table)]
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_csv_value(row[name]) for name in names])
+        buffer.seek(0)
+        columns = ', '.join(f'"{name}"' for name in names)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY "{table.name}" ({columns}) FROM STDIN WITH CSV', buffer)
+        finally:
+            cursor.close()
+        return
+    connection.execute(table.insert(), rows)
+
+
+def validate_records(table, records, max_rows=None):
+    """Split parsed records into ``(valid rows, errors)``."""
+    rows, errors = [], []
+    for position, record in records:
+        if max_rows is not None and position > max_rows:
+            errors.append({'row': position, 'error': f'batch is limited to {max_rows} records'})
+            break
+        if isinstance(record, Exception):
+            errors.append({'row': position, 'error': str(record)})
+            continue
+        try:
+            rows.append(validate(table, record))
+        except ValueError as e:
+            errors.append({'row': position, 'error': str(e)})
+    return rows, errors
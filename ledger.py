@@ -0,0 +1,220 @@
+"""
+Running-totals ledger for investments, expenses and sales.
+
+A small summary table holds the total amount and row count for each base
+table plus one row per investor. It is updated from an ``after_flush`` session
+hook, so every ORM insert, edit or delete adjusts the ledger in the same
+transaction as the change itself. ``rebuild`` and ``verify`` recompute it from
+the base tables.
+
+The ledger also carries a ``data_version`` row whose count is bumped by every
+flush that touches a base table. Caches key their entries on it, so a write in
+any worker invalidates cached summaries in all of them.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+INVESTMENT = 'investment'
+EXPENSE = 'expense'
+SALE = 'sale'
+DATA_VERSION = 'data_version'
+
+# Totals drift by float rounding when maintained incrementally
+TOLERANCE = 0.005
+
+_models = {}
+
+
+def investor_key(name):
+    return f'investor:{name}'
+
+
+def install(session, ledger_model, investment_model, expense_model, sale_model):
+    """Register the models and hook ledger maintenance onto ``session`` flushes."""
+    _models.update({
+        'ledger': ledger_model,
+        INVESTMENT: investment_model,
+        EXPENSE: expense_model,
+        SALE: sale_model,
+    })
+    event.listen(session, 'after_flush', _after_flush)
+
+
+def key_for(model):
+    """Ledger key of a tracked model class, or None."""
+    for key in (INVESTMENT, EXPENSE, SALE):
+        if model is _models[key]:
+            return key
+    return None
+
+
+def _table_key(obj):
+    return key_for(type(obj))
+
+
+def _old_value(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def collect_deltas(new=(), dirty=(), deleted=()):
+    """Map ledger key -> [amount delta, count delta] for a set of changes."""
+    deltas = defaultdict(lambda: [0.0, 0])
+
+    def apply(key, obj, sign, amount=None, investor=None):
+        amount = obj.amount if amount is None else amount
+        deltas[key][0] += sign * float(amount)
+        deltas[key][1] += sign
+        if key == INVESTMENT:
+            name = obj.investor_name if investor is None else investor
+            deltas[investor_key(name)][0] += sign * float(amount)
+            deltas[investor_key(name)][1] += sign
+
+    for obj in new:
+        key = _table_key(obj)
+        if key:
+            apply(key, obj, 1)
+    for obj in deleted:
+        key = _table_key(obj)
+        if key:
+            apply(key, obj, -1, _old_value(obj, 'amount'),
+                  _old_value(obj, 'investor_name') if key == INVESTMENT else None)
+    for obj in dirty:
+        key = _table_key(obj)
+        if not key:
+            continue
+        old_investor = _old_value(obj, 'investor_name') if key == INVESTMENT else None
+        apply(key, obj, -1, _old_value(obj, 'amount'), old_investor)
+        apply(key, obj, 1)
+
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+
+
+def row_deltas(key, rows):
+    """Deltas (including a version bump) for rows inserted outside the ORM."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        deltas[key][0] += row['amount']
+        deltas[key][1] += 1
+        if key == INVESTMENT:
+            deltas[investor_key(row['investor_name'])][0] += row['amount']
+            deltas[investor_key(row['investor_name'])][1] += 1
+    if rows:
+        deltas[DATA_VERSION] = [0.0, 1]
+    return dict(deltas)
+
+
+def apply_deltas(connection, deltas):
+    """Add ``deltas`` to the ledger with one multi-row upsert."""
+    if not deltas:
+        return
+    table = _models['ledger'].__table__
+    dialect_insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(table).values([
+        {'key': key, 'total': total, 'count': count}
+        for key, (total, count) in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={
+            'total': table.c.total + stmt.excluded.total,
+            'count': table.c.count + stmt.excluded.count,
+        })
+    connection.execute(stmt)
+    # An investor whose last investment was renamed or deleted has no row in
+    # the base table any more, so it must not linger here as a zero row
+    emptied = [key for key, (_, count) in deltas.items()
+               if count < 0 and key.startswith(investor_key(''))]
+    if emptied:
+        connection.execute(table.delete().where(table.c.key.in_(emptied), table.c.count <= 0))
+
+
+def _after_flush(session, flush_context):
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    deltas = collect_deltas(session.new, dirty, session.deleted)
+    if any(_table_key(obj) for obj in (*session.new, *dirty, *session.deleted)):
+        deltas[DATA_VERSION] = [0.0, 1]
+    apply_deltas(session.connection(), deltas)
+
+
+def bump_version(connection):
+    """Invalidate cached summaries after a write that bypassed the ORM."""
+    apply_deltas(connection, {DATA_VERSION: [0.0, 1]})
+
+
+def data_version(session):
+    """Current data version; 0 before the first write."""
+    ledger = _models['ledger']
+    version = session.query(ledger.count).filter(ledger.key == DATA_VERSION).scalar()
+    return version or 0
+
+
+def compute(session):
+    """Recompute every ledger row from the base tables."""
+    rows = {}
+    for key in (INVESTMENT, EXPENSE, SALE):
+        model = _models[key]
+        total, count = session.query(
+            func.coalesce(func.sum(model.amount), 0.0), func.count(model.id)).one()
+        rows[key] = (float(total), count)
+
+    investment = _models[INVESTMENT]
+    per_investor = session.query(
+        investment.investor_name, func.sum(investment.amount), func.count(investment.id)
+    ).group_by(investment.investor_name).all()
+    for name, total, count in per_investor:
+        rows[investor_key(name)] = (float(total), count)
+    return rows
+
+
+def rebuild(session):
+    """Replace the ledger contents with totals recomputed from the base tables."""
+    ledger = _models['ledger']
+    rows = compute(session)
+    session.query(ledger).filter(ledger.key != DATA_VERSION).delete()
+    session.execute(ledger.__table__.insert(), [
+        {'key': key, 'total': total, 'count': count} for key, (total, count) in rows.items()
+    ])
+    bump_version(session.connection())
+    session.commit()
+    return rows
+
+
+def verify(session):
+    """Return ``(key, ledger value, expected value)`` for every mismatched row."""
+    expected = compute(session)
+    actual = read(session)
+    actual.pop(DATA_VERSION, None)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, (0.0, 0))
+        have = actual.get(key, (0.0, 0))
+        if abs(want[0] - have[0]) > TOLERANCE or want[1] != have[1]:
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def ensure(session):
+    """Build the ledger on first start against an existing database."""
+    ledger = _models['ledger']
+    if session.query(ledger.key).first() is not None:
+        return
+    try:
+        rebuild(session)
+    except IntegrityError:
+        # Another worker built it first
+        session.rollback()
+
+
+def read(session, keys=None):
+    """Return ``{key: (total, count)}`` for the requested ledger rows."""
+    ledger = _models['ledger']
+    query = session.query(ledger.key, ledger.total, ledger.count)
+    if keys is not None:
+        query = query.filter(ledger.key.in_(list(keys)))
+    return {key: (float(total), count) for key, total, count in query}
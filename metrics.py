@@ -0,0 +1,273 @@
+"""
+Request instrumentation: Prometheus metrics and ``Server-Timing`` headers.
+
+Every request records its latency, the number of SQL statements it ran and
+their total time, and each template render. Reports record their size. The
+values live in per-process counters and histograms, and each gunicorn
+worker writes a snapshot of them to ``METRICS_DIR`` at most once a second,
+so ``/metrics`` can serve the sum over all workers in the Prometheus text
+format no matter which worker answers the scrape.
+
+Recording costs a few dictionary updates under a lock per request and per
+SQL statement; nothing is formatted until a scrape.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests served, by endpoint, method and status.', None),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency until the response is returned.', LATENCY_BUCKETS),
+    'db_queries_per_request': (
+        'histogram', 'SQL statements executed per request.', QUERY_COUNT_BUCKETS),
+    'db_time_per_request_seconds': (
+        'histogram', 'Time spent in SQL statements per request.', LATENCY_BUCKETS),
+    'template_render_seconds': (
+        'histogram', 'Jinja template render time.', LATENCY_BUCKETS),
+    'export_size_bytes': (
+        'histogram', 'Size of generated exports.', SIZE_BUCKETS),
+    'export_duration_seconds': (
+        'histogram', 'Time to generate an export.', LATENCY_BUCKETS),
+}
+
+FLUSH_INTERVAL = 1.0
+
+
+def default_directory():
+    return os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'londons_kitchen_metrics'))
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _key(labels))
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()],
+            }
+
+    def _path(self):
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    def flush(self, force=False):
+        """Write this process's snapshot for the other workers to read."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+        path = self._path()
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush(force=True)
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        """All workers' metrics summed, in the Prometheus text format."""
+        counters, histograms = {}, {}
+        for snapshot in self._snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, _key(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total, count in snapshot['histograms']:
+                key = (name, _key(labels))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = counters if kind == 'counter' else histograms
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in keys:
+                labels = key[1]
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {series[key]}')
+                    continue
+                counts, total, count = series[key]
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {total}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else f'{value:.1f}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def clear(directory, prefix='metrics-'):
+    """Remove snapshots left by a previous server run."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith(prefix):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+registry = Registry(default_directory())
+
+
+def init_app(app, engine):
+    """Time requests, SQL statements and template renders for ``app``."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if started and has_request_context():
+            elapsed = time.perf_counter() - started.pop()
+            g.metrics_queries = g.get('metrics_queries', 0) + 1
+            g.metrics_db_time = g.get('metrics_db_time', 0.0) + elapsed
+
+    def before_render(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('metrics_render_started', []).append(time.perf_counter())
+
+    def rendered(sender, template, context, **extra):
+        started = g.get('metrics_render_started') if has_request_context() else None
+        if started:
+            elapsed = time.perf_counter() - started.pop()
+            g.metrics_render_time = g.get('metrics_render_time', 0.0) + elapsed
+            registry.observe('template_render_seconds', elapsed, template=template.name or '')
+
+    before_render_template.connect(before_render, app, weak=False)
+    template_rendered.connect(rendered, app, weak=False)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        queries = g.get('metrics_queries', 0)
+        db_time = g.get('metrics_db_time', 0.0)
+        render_time = g.get('metrics_render_time', 0.0)
+
+        registry.inc('http_requests_total', endpoint=endpoint, method=request.method,
+                     status=str(response.status_code))
+        registry.observe('http_request_duration_seconds', elapsed, endpoint=endpoint,
+                         method=request.method)
+        registry.observe('db_queries_per_request', queries, endpoint=endpoint)
+        registry.observe('db_time_per_request_seconds', db_time, endpoint=endpoint)
+
+        timing = [f'db;dur={db_time * 1000:.1f};desc="{queries} queries"']
+        if render_time:
+            timing.append(f'tpl;dur={render_time * 1000:.1f}')
+        timing.append(f'app;dur={elapsed * 1000:.1f}')
+        response.headers.add('Server-Timing', ', '.join(timing))
+
+        try:
+            registry.flush()
+        except OSError:
+            pass
+        return response
+
+
+def observe_export(fmt, size, seconds):
+    registry.observe('export_size_bytes', size, format=fmt)
+    registry.observe('export_duration_seconds', seconds, format=fmt)
+
+
+def counted(chunks, fmt):
+    """Pass byte chunks through, recording the export's size once it ends."""
+    started = time.perf_counter()
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        observe_export(fmt, size, time.perf_counter() - started)
@@ -0,0 +1,155 @@
+"""
+Schema migrations for indexes on existing databases.
+
+``db.create_all()`` creates missing tables (and the indexes declared on the
+models) but never changes a table that already exists. The migrations below
+bring existing SQLite and PostgreSQL databases up to date and are recorded in
+a ``schema_migrations`` table. Every operation is idempotent, and on
+PostgreSQL indexes are built with ``CREATE INDEX CONCURRENTLY`` outside a
+transaction, so the running app keeps reading and writing while they build.
+Full-text search indexes are GIN indexes on PostgreSQL and FTS5 tables with
+sync triggers on SQLite (see search.py).
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+
+import search
+
+Migration = namedtuple('Migration', ['id', 'description', 'operations'])
+
+# PostgreSQL advisory lock key, so two deploys never migrate at once
+LOCK_KEY = 7305_2025
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('id', String(100), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class CreateIndex:
+    using = None
+
+    def __init__(self, name, table, columns):
+        self.name = name
+        self.table = table
+        self.columns = columns
+
+    def __str__(self):
+        return f"create index {self.name} on {self.table} ({', '.join(self.columns)})"
+
+    def definition(self):
+        return ', '.join(f'"{column}"' for column in self.columns)
+
+    def apply(self, connection):
+        columns = self.definition()
+        using = f' USING {self.using}' if self.using else ''
+        if connection.dialect.name == 'postgresql':
+            # A failed concurrent build leaves an INVALID index behind; drop it first
+            invalid = connection.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"), {'name': self.name}).first()
+            if invalid:
+                connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.name}"'))
+            connection.execute(text(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{self.name}" ON "{self.table}"{using} ({columns})'))
+        else:
+            connection.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns})'))
+
+
+class CreateSearchIndex(CreateIndex):
+    """A full-text index: GIN over a tsvector expression, or FTS5 with triggers on SQLite."""
+    using = 'gin'
+
+    def __init__(self, table):
+        super().__init__(search.index_name(table), table, search.COLUMNS[table])
+
+    def __str__(self):
+        return f"create search index on {self.table} ({', '.join(self.columns)})"
+
+    def definition(self):
+        return search.document_sql(self.columns)
+
+    def apply(self, connection):
+        if connection.dialect.name == 'postgresql':
+            return super().apply(connection)
+        for statement in search.sqlite_ddl(self.table, self.columns):
+            connection.execute(text(statement))
+
+
+class DropIndex:
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f"drop index {self.name}"
+
+    def apply(self, connection):
+        concurrently = 'CONCURRENTLY ' if connection.dialect.name == 'postgresql' else ''
+        connection.execute(text(f'DROP INDEX {concurrently}IF EXISTS "{self.name}"'))
+
+
+MIGRATIONS = [
+    Migration('0001_date_indexes', 'Listing order, keyset pages and date-range filters', [
+        CreateIndex('ix_investment_date_id', 'investment', ['date', 'id']),
+        CreateIndex('ix_expense_date_id', 'expense', ['date', 'id']),
+        CreateIndex('ix_sale_date_id', 'sale', ['date', 'id']),
+    ]),
+    Migration('0002_expense_category_date', 'Category filters and per-category totals', [
+        CreateIndex('ix_expense_category_date', 'expense', ['category', 'date']),
+    ]),
+    Migration('0003_investment_investor_name', 'Per-investor totals', [
+        CreateIndex('ix_investment_investor_name', 'investment', ['investor_name']),
+    ]),
+    Migration('0004_search_indexes', 'Full-text search over expense and sale descriptions', [
+        CreateSearchIndex('expense'),
+        CreateSearchIndex('sale'),
+    ]),
+]
+
+
+def applied(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.id for row in connection.execute(select(schema_migrations.c.id))}
+
+
+def pending(engine):
+    with engine.begin() as connection:
+        done = applied(connection)
+    return [migration for migration in MIGRATIONS if migration.id not in done]
+
+
+def mark_applied(connection, migration):
+    connection.execute(schema_migrations.insert().values(
+        id=migration.id, applied_at=datetime.utcnow()))
+
+
+def upgrade(engine, echo=print):
+    """Apply every pending migration in order; returns the ids applied."""
+    with engine.connect() as connection:
+        # Concurrent index builds cannot run inside a transaction block
+        connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+        postgres = connection.dialect.name == 'postgresql'
+        if postgres:
+            # Index builds on large tables outlast the web statement timeout
+            connection.execute(text('SET statement_timeout = 0'))
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': LOCK_KEY})
+        try:
+            done = applied(connection)
+            ran = []
+            for migration in MIGRATIONS:
+                if migration.id in done:
+                    continue
+                echo(f'Applying {migration.id}: {migration.description}')
+                for operation in migration.operations:
+                    echo(f'  {operation}')
+                    operation.apply(connection)
+                mark_applied(connection, migration)
+                ran.append(migration.id)
+            return ran
+        finally:
+            if postgres:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': LOCK_KEY})
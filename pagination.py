@@ -0,0 +1,105 @@
+"""
+Keyset pagination and filtering for the listing pages.
+
+Pages are ordered newest first on ``(date, id)`` and addressed by opaque
+cursors holding the boundary row's key, so every page costs an index range
+scan of ``per_page`` rows however deep into the history it is.
+"""
+import base64
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, tuple_
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+Filters = namedtuple('Filters', ['start', 'end', 'category'])
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor', 'per_page'])
+
+
+def encode_cursor(date, id):
+    raw = f"{date.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(date, id)`` for a cursor token, or None if it is malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        date, id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date), int(id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+
+def parse_filters(args):
+    """Read ``from``/``to`` (inclusive, YYYY-MM-DD) and ``category`` query args."""
+    end = _parse_date(args.get('to'))
+    return Filters(
+        start=_parse_date(args.get('from')),
+        end=end + timedelta(days=1) if end else None,
+        category=args.get('category') or None,
+    )
+
+
+def parse_per_page(args):
+    per_page = args.get('per_page', DEFAULT_PER_PAGE, type=int) or DEFAULT_PER_PAGE
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def apply_filters(query, model, filters):
+    if filters.start is not None:
+        query = query.filter(model.date >= filters.start)
+    if filters.end is not None:
+        query = query.filter(model.date < filters.end)
+    if filters.category is not None and hasattr(model, 'category'):
+        query = query.filter(model.category == filters.category)
+    return query
+
+
+def filtered_totals(query, model):
+    """``(sum, count)`` of ``model.amount`` over a filtered query, computed DB-side."""
+    total, count = query.with_entities(
+        func.coalesce(func.sum(model.amount), 0.0), func.count(model.id)).one()
+    return float(total), count
+
+
+def keyset_page(query, model, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Fetch one page of ``query`` ordered by ``(date, id)`` descending.
+
+    ``after`` continues past a cursor towards older rows, ``before`` walks
+    back towards newer ones. One extra row is fetched to detect whether a
+    further page exists.
+    """
+    key = tuple_(model.date, model.id)
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before is not None:
+        rows = query.filter(key > tuple_(*before)) \
+            .order_by(model.date.asc(), model.id.asc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id) if rows else None
+        prev_cursor = encode_cursor(rows[0].date, rows[0].id) if rows and has_more else None
+        return Page(rows, next_cursor, prev_cursor, per_page)
+
+    if after is not None:
+        query = query.filter(key < tuple_(*after))
+    rows = query.order_by(model.date.desc(), model.id.desc()).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1].date, rows[-1].id) if rows and has_more else None
+    prev_cursor = encode_cursor(rows[0].date, rows[0].id) if rows and after is not None else None
+    return Page(rows, next_cursor, prev_cursor, per_page)
@@ -0,0 +1,279 @@
+"""
+On-demand profiling of single requests.
+
+An admin request with ``profile=1`` in the query string (or an
+``X-Profile: 1`` header) runs under cProfile while a sampler thread records
+the request thread's stack every ``PROFILE_INTERVAL_MS``. The whole response
+is covered, including bodies streamed after the view returns. Each profile is
+stored in ``PROFILE_DIR`` as three files: ``<id>.prof`` (cProfile stats for
+pstats or snakeviz), ``<id>.speedscope.json`` (a flamegraph for
+https://www.speedscope.app) and ``<id>.json`` (what was profiled and the top
+functions). The oldest profiles are deleted once the directory exceeds
+``PROFILE_MAX_MB``.
+
+Sampled times include cProfile's own overhead, so compare the flamegraph's
+proportions rather than its absolute durations. One request per worker is
+profiled at a time; others are served normally with ``X-Profile: busy``.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from werkzeug.wrappers import Request
+from werkzeug.wsgi import ClosingIterator
+
+import admin
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+TOP_FUNCTIONS = 15
+
+
+def settings(env=None):
+    env = os.environ if env is None else env
+    return {
+        'directory': env.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'londons_kitchen_profiles')),
+        'max_bytes': int(float(env.get('PROFILE_MAX_MB', 200)) * 1024 * 1024),
+        'interval': float(env.get('PROFILE_INTERVAL_MS', 1)) / 1000,
+    }
+
+
+def requested(req):
+    """True for an admin request that asks to be profiled."""
+    flag = req.args.get('profile') or req.headers.get('X-Profile') or ''
+    return flag.lower() in ('1', 'true', 'yes', 'on') and admin.is_admin(req)
+
+
+def _path_without_token(req):
+    args = [f'{name}={value}' for name, value in req.args.items(multi=True) if name != 'admin_token']
+    return req.path + ('?' + '&'.join(args) if args else '')
+
+
+class Sampler(threading.Thread):
+    """Records one thread's call stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((getattr(code, 'co_qualname', code.co_name), code.co_filename,
+                              code.co_firstlineno))
+                frame = frame.f_back
+            # Weighted by the time since the previous sample, in milliseconds
+            self.stacks[tuple(reversed(stack))] += (now - last) * 1000
+            self.samples += 1
+            last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def speedscope(self, name):
+        """The samples as a speedscope "sampled" profile."""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, weight in self.stacks.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(round(weight, 3))
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'londons-kitchen profiling.py',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled', 'name': name, 'unit': 'milliseconds',
+                'startValue': 0, 'endValue': round(sum(weights), 3),
+                'samples': samples, 'weights': weights,
+            }],
+        }
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    """The functions with the most cumulative time, as dicts."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f'{name} ({os.path.basename(filename)}:{line})', 'calls': calls,
+                     'own_ms': round(own * 1000, 2), 'cumulative_ms': round(cumulative * 1000, 2)})
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+
+class ProfileStore:
+    """Profile files in one directory, trimmed to ``max_bytes``."""
+
+    SUFFIXES = ('.json', '.prof', '.speedscope.json')
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def new_id(self):
+        return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{secrets.token_hex(3)}"
+
+    def save(self, profile_id, meta, profiler, sampler):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f'{profile_id}.prof'))
+        with open(os.path.join(self.directory, f'{profile_id}.speedscope.json'), 'w') as f:
+            json.dump(sampler.speedscope(f"{meta['method']} {meta['path']}"), f)
+        meta = dict(meta, id=profile_id, top=top_functions(profiler))
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(meta, f)
+        self.trim()
+
+    def _files(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return {}
+        groups = {}
+        for name in names:
+            for suffix in self.SUFFIXES[::-1]:
+                if name.endswith(suffix):
+                    groups.setdefault(name[:-len(suffix)], []).append(name)
+                    break
+        return groups
+
+    def _sizes(self):
+        sizes = {}
+        for profile_id, names in self._files().items():
+            size = 0
+            for name in names:
+                try:
+                    size += os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            sizes[profile_id] = size
+        return sizes
+
+    def disk_usage(self):
+        return sum(self._sizes().values())
+
+    def trim(self):
+        """Delete the oldest profiles until the directory fits in ``max_bytes``."""
+        with self._lock:
+            sizes = self._sizes()
+            total = sum(sizes.values())
+            # Ids start with their timestamp, so they sort oldest first
+            for profile_id in sorted(sizes):
+                if total <= self.max_bytes:
+                    break
+                for suffix in self.SUFFIXES:
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + suffix))
+                    except OSError:
+                        pass
+                total -= sizes[profile_id]
+
+    def recent(self, limit=50):
+        """Metadata of the newest profiles, newest first."""
+        profiles = []
+        for profile_id in sorted(self._files(), reverse=True):
+            if len(profiles) >= limit:
+                break
+            try:
+                with open(os.path.join(self.directory, f'{profile_id}.json')) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles requests for which ``requested`` is true."""
+
+    def __init__(self, wsgi_app, store, interval, endpoint_for=None, logger=None):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.interval = interval
+        self.endpoint_for = endpoint_for
+        self.logger = logger
+        self._busy = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        req = Request(environ)
+        if not requested(req):
+            return self.wsgi_app(environ, start_response)
+        if not self._busy.acquire(blocking=False):
+            def busy_start_response(status, headers, exc_info=None):
+                return start_response(status, headers + [('X-Profile', 'busy')], exc_info)
+            return self.wsgi_app(environ, busy_start_response)
+        return self._profiled(req, environ, start_response)
+
+    def _profiled(self, req, environ, start_response):
+        profile_id = self.store.new_id()
+        state = {}
+
+        def profiled_start_response(status, headers, exc_info=None):
+            state['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers + [('X-Profile-Id', profile_id)], exc_info)
+
+        profiler = cProfile.Profile()
+        sampler = Sampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+
+        def finish():
+            profiler.disable()
+            sampler.stop()
+            try:
+                self.store.save(profile_id, {
+                    'method': req.method,
+                    'path': _path_without_token(req),
+                    'endpoint': self.endpoint_for(environ) if self.endpoint_for else None,
+                    'status': state.get('status'),
+                    'bytes': state.get('bytes', 0),
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                    'samples': sampler.samples,
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'pid': os.getpid(),
+                }, profiler, sampler)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f'Could not save profile {profile_id}: {e}')
+            finally:
+                self._busy.release()
+
+        def counted(body):
+            for chunk in body:
+                state['bytes'] = state.get('bytes', 0) + len(chunk)
+                yield chunk
+
+        sampler.start()
+        profiler.enable()
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            finish()
+            raise
+        # The server closes the response once the body is sent (or the client
+        # goes away), which ends the profile
+        return ClosingIterator(counted(body), [getattr(body, 'close', lambda: None), finish])
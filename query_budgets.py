@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Per-route SQL query budgets.
+
+Drives every route in app.py against a seeded SQLite database, counting the
+SQL statements each request executes (via SQLAlchemy cursor events), first
+with a small data set and again after seeding many more rows. A route fails
+when it exceeds its declared budget, when its query count grows with the row
+count, or when one statement repeats often enough to look like an N+1 loop.
+Routes without a declared budget fail too, so new routes must add one.
+
+Summary caches are cleared before every request, so budgets are for a cold
+cache.
+
+Usage:
+    python query_budgets.py [--small 20] [--large 400] [--verbose]
+
+Exits 1 if any route is over budget.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+# A throwaway database; must be set before app is imported
+_db_dir = tempfile.mkdtemp(prefix='query_budgets_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'budget.db')}"
+os.environ.setdefault('EXPORT_JOB_DIR', os.path.join(_db_dir, 'exports'))
+os.environ.setdefault('METRICS_DIR', os.path.join(_db_dir, 'metrics'))
+os.environ['ADMIN_TOKEN'] = 'query-budgets'
+os.environ['PROFILE_DIR'] = os.path.join(_db_dir, 'profiles')
+
+import random  # noqa: E402
+
+from sqlalchemy import event, func  # noqa: E402
+
+import ledger  # noqa: E402
+from app import app, db, export_jobs, init_db, summary_cache, warm_up, Investment, Expense, Sale  # noqa: E402
+from ingest import insert_rows  # noqa: E402
+
+# Identical statements allowed per request before it is reported as N+1
+REPEAT_LIMIT = 3
+
+Case = namedtuple('Case', ['endpoint', 'method', 'path', 'budget', 'json', 'body', 'content_type',
+                           'headers'])
+
+
+def case(endpoint, path, budget, method='GET', json=None, body=None, content_type=None, headers=None):
+    return Case(endpoint, method, path, budget, json, body, content_type, headers)
+
+
+def last_id(model):
+    with app.app_context():
+        return db.session.query(func.max(model.id)).scalar()
+
+
+def finished_job():
+    response = app.test_client().post('/export_jobs')
+    job_id = response.get_json()['id']
+    deadline = time.monotonic() + 60
+    while export_jobs.status(job_id)['status'] not in ('done', 'failed'):
+        if time.monotonic() > deadline:
+            raise RuntimeError('export job did not finish')
+        time.sleep(0.05)
+    return job_id
+
+
+def profiled_file(suffix):
+    response = app.test_client().get('/?profile=1&admin_token=query-budgets', buffered=True)
+    return f"/admin/profiles/{response.headers['X-Profile-Id']}{suffix}?admin_token=query-budgets"
+
+
+def current_etag(path):
+    return {'If-None-Match': app.test_client().get(path).headers['ETag']}
+
+
+INVESTMENT = {'investor_name': 'Shree', 'amount': '250', 'date': '2025-03-04'}
+EXPENSE = {'description': 'Gas refill', 'category': 'Supplies', 'amount': '42.5', 'date': '2025-03-04'}
+SALE = {'description': 'Market day', 'amount': '310', 'date': '2025-03-04'}
+# Edits change every field of the row the add routes just created
+EDITED_INVESTMENT = dict(INVESTMENT, investor_name='Adwait', amount='275')
+EDITED_EXPENSE = dict(EXPENSE, category='Fuel', amount='40')
+EDITED_SALE = dict(SALE, amount='325')
+
+# Budgets are for one request with a cold summary cache
+CASES = [
+    case('index', '/', 1),
+    # The dashboard's monthly series and recent activity are fetched from the API
+    case('dashboard', '/dashboard', 1),
+    case('dashboard', '/dashboard?year=2024', 1),
+    case('investments', '/investments', 3),
+    case('expenses', '/expenses?category=Supplies&from=2024-01-01&to=2025-12-31', 4),
+    case('sales', '/sales?per_page=10', 3),
+    case('expenses', '/expenses?q=gas+refill&from=2024-01-01', 4),
+    case('sales', '/sales?q=market&per_page=10&after=10', 3),
+    case('add_investment', '/add_investment', 4, 'POST', json=INVESTMENT),
+    case('add_expense', '/add_expense', 4, 'POST', json=EXPENSE),
+    case('add_sale', '/add_sale', 4, 'POST', json=SALE),
+    case('edit_investment', lambda: f'/edit_investment/{last_id(Investment)}', 1),
+    case('edit_investment', lambda: f'/edit_investment/{last_id(Investment)}', 4, 'POST',
+         json=EDITED_INVESTMENT),
+    case('edit_expense', lambda: f'/edit_expense/{last_id(Expense)}', 1),
+    case('edit_expense', lambda: f'/edit_expense/{last_id(Expense)}', 4, 'POST', json=EDITED_EXPENSE),
+    case('edit_sale', lambda: f'/edit_sale/{last_id(Sale)}', 1),
+    case('edit_sale', lambda: f'/edit_sale/{last_id(Sale)}', 4, 'POST', json=EDITED_SALE),
+    case('delete_investment', lambda: f'/delete_investment/{last_id(Investment)}', 4, 'POST'),
+    case('delete_expense', lambda: f'/delete_expense/{last_id(Expense)}', 4, 'POST'),
+    case('delete_sale', lambda: f'/delete_sale/{last_id(Sale)}', 4, 'POST'),
+    case('export_data', '/export_data', 6),
+    case('start_export_job', '/export_jobs', 0, 'POST'),
+    case('export_job_status', lambda: f'/export_jobs/{finished_job()}', 0),
+    case('export_job_download', lambda: f'/export_jobs/{finished_job()}/download', 0),
+    case('export_table', '/export/sales.csv', 1),
+    case('bulk_ingest', '/bulk/sales', 3, 'POST',
+         body='description,amount,date\nTill A,10,2025-03-01\nTill B,12,2025-03-02\n',
+         content_type='text/csv'),
+    case('cache_stats', '/cache_stats?admin_token=query-budgets', 1),
+    case('pool_stats', '/pool_stats?admin_token=query-budgets', 0),
+    case('prometheus_metrics', '/metrics', 0),
+    case('health', '/health', 0),
+    case('ready', '/ready', 1),
+    case('slow_query_report', '/admin/slow_queries?admin_token=query-budgets', 0),
+    # Profiling a request must not change what it queries
+    case('dashboard', '/dashboard?profile=1&admin_token=query-budgets', 1),
+    case('api_summary', '/api/v1/summary', 2),
+    case('api_summary', '/api/v1/summary', 1, headers=lambda: current_etag('/api/v1/summary')),
+    case('api_categories', '/api/v1/categories', 2),
+    case('api_series', '/api/v1/series?year=2024', 3),
+    case('api_series', '/api/v1/series?year=2024', 1,
+         headers=lambda: current_etag('/api/v1/series?year=2024')),
+    case('api_activity', '/api/v1/activity', 2),
+    case('api_activity', '/api/v1/activity?limit=50', 2),
+    case('api_activity', '/api/v1/activity', 1, headers=lambda: current_etag('/api/v1/activity')),
+    case('api_listing', '/api/v1/expenses?category=Rent&per_page=20', 3),
+    case('api_listing', '/api/v1/expenses?q=supplies', 3),
+    case('api_listing', '/api/v1/sales', 1, headers=lambda: current_etag('/api/v1/sales')),
+    case('profile_index', '/admin/profiles?admin_token=query-budgets', 0),
+    case('profile_file', lambda: profiled_file('.speedscope.json'), 0),
+]
+
+
+class QueryLog:
+    """Statements executed by the request thread (not background export jobs)."""
+
+    def __init__(self, engine):
+        self.statements = None
+        self.thread = None
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is not None and threading.get_ident() == self.thread:
+            self.statements.append(statement)
+
+    def start(self):
+        self.thread = threading.get_ident()
+        self.statements = []
+
+    def stop(self):
+        statements, self.statements = self.statements, None
+        return statements
+
+
+def normalise(statement):
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    return re.sub(r'\(\?(, \?)+\)', '(?...)', statement)
+
+
+def seed(count, rng):
+    """Add ``count`` rows to each table (bypassing the routes) and rebuild the ledger."""
+    start = datetime(2024, 1, 1)
+    categories = ['Supplies', 'Rent', 'Salary', 'Fuel', 'Marketing']
+    with app.app_context(), db.engine.begin() as connection:
+        def when():
+            return start + timedelta(days=rng.randint(0, 700), minutes=rng.randint(0, 1439))
+        insert_rows(connection, Investment.__table__, [
+            {'investor_name': rng.choice(['Shree', 'Adwait']), 'amount': rng.randint(100, 5000),
+             'date': when()} for _ in range(count)])
+        insert_rows(connection, Expense.__table__, [
+            {'description': f'Expense {i}', 'category': rng.choice(categories),
+             'amount': rng.randint(5, 500) / 1.0, 'date': when()} for i in range(count)])
+        insert_rows(connection, Sale.__table__, [
+            {'description': f'Sale {i}', 'amount': rng.randint(20, 900) / 1.0, 'date': when()}
+            for i in range(count)])
+    with app.app_context():
+        ledger.rebuild(db.session)
+
+
+def run_cases(client, log):
+    results = []
+    for c in CASES:
+        path = c.path() if callable(c.path) else c.path
+        headers = c.headers() if callable(c.headers) else c.headers
+        summary_cache.clear()
+        log.start()
+        response = client.open(path, method=c.method, json=c.json, data=c.body,
+                               content_type=c.content_type, headers=headers, buffered=True)
+        response.get_data()
+        statements = log.stop()
+        if response.status_code >= 400:
+            raise RuntimeError(f'{c.method} {path} returned {response.status_code}')
+        results.append((c, path, statements))
+    return results
+
+
+def check(small, large, verbose=False, out=sys.stdout):
+    failures = []
+    print(f"{'route':<44} {'small':>5} {'large':>5} {'budget':>6}  repeats", file=out)
+    for (c, path, few), (_, _, many) in zip(small, large):
+        repeats = Counter(normalise(s) for s in many).most_common(1)
+        worst = repeats[0][1] if repeats else 0
+        problems = []
+        if len(many) > c.budget or len(few) > c.budget:
+            problems.append(f'over budget ({max(len(few), len(many))} > {c.budget})')
+        if len(many) > len(few):
+            problems.append(f'grows with rows ({len(few)} -> {len(many)})')
+        if worst > REPEAT_LIMIT:
+            problems.append(f'possible N+1: statement ran {worst} times')
+        label = f'{c.method} {path}'[:44]
+        print(f"{label:<44} {len(few):>5} {len(many):>5} {c.budget:>6}  {worst:>7}"
+              f"{'  FAIL: ' + '; '.join(problems) if problems else ''}", file=out)
+        if verbose or problems:
+            for statement, count in Counter(normalise(s) for s in many).most_common():
+                print(f'    {count} x {statement[:150]}', file=out)
+        if problems:
+            failures.append((label, problems))
+    return failures
+
+
+def unbudgeted():
+    covered = {c.endpoint for c in CASES}
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                  if rule.endpoint != 'static' and rule.endpoint not in covered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--small', type=int, default=20, help='rows per table for the first pass')
+    parser.add_argument('--large', type=int, default=400, help='rows per table for the second pass')
+    parser.add_argument('--verbose', action='store_true', help='list every statement per route')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    init_db()
+    warm_up()
+    with app.app_context():
+        log = QueryLog(db.engine)
+    client = app.test_client()
+
+    seed(args.small, rng)
+    small = run_cases(client, log)
+    seed(args.large - args.small, rng)
+    large = run_cases(client, log)
+
+    failures = check(small, large, verbose=args.verbose)
+    missing = unbudgeted()
+    for endpoint in missing:
+        print(f'FAIL: route {endpoint} has no query budget', file=sys.stdout)
+    if failures or missing:
+        print(f'\n{len(failures) + len(missing)} route(s) failed')
+        sys.exit(1)
+    print(f'\nAll {len(CASES)} requests within budget')
+
+
+if __name__ == '__main__':
+    main()
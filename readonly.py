@@ -0,0 +1,28 @@
+"""
+Read-only query layer for pages and exports.
+
+Queries built here select plain columns instead of mapped entities, so rows
+come back as SQLAlchemy ``Row`` tuples (attribute access by column name, no
+``__dict__``) rather than model instances with identity-map entries,
+attribute instrumentation and change tracking. Templates read them exactly
+like model instances (``row.amount``, ``row.date``).
+"""
+CHUNK_SIZE = 1000
+
+# Columns each read path needs, per table name
+COLUMNS = {
+    'investment': ('id', 'investor_name', 'amount', 'date'),
+    'expense': ('id', 'description', 'category', 'amount', 'date'),
+    'sale': ('id', 'description', 'amount', 'date'),
+}
+
+
+def rows(session, model, columns=None):
+    """A query over ``columns`` of ``model`` (default: the listing columns)."""
+    columns = columns or COLUMNS[model.__tablename__]
+    return session.query(*(getattr(model, name) for name in columns))
+
+
+def stream(query, chunk_size=CHUNK_SIZE):
+    """Iterate a query in chunks through a server-side cursor where supported."""
+    return query.yield_per(chunk_size)
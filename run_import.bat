@@ -11,7 +11,7 @@ set /p choice="Enter your choice (1-3): "
 
 if "%choice%"=="1" (
     echo Running interactive import script...
-    python import_simple.py
+    python import_data.py --replace
 ) else if "%choice%"=="2" (
     echo.
     echo === Railway Dashboard Method ===
@@ -31,7 +31,7 @@ if "%choice%"=="1" (
     echo 2. Run: Set-ExecutionPolicy -ExecutionPolicy RemoteSigned -Scope CurrentUser
     echo 3. Run: npm install -g @railway/cli
     echo 4. Run: railway login
-    echo 5. Run: railway run python import_simple.py
+    echo 5. Run: railway run python import_data.py --replace
     pause
 ) else (
     echo Invalid choice. Please run again.
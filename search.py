@@ -0,0 +1,125 @@
+"""
+Full-text search over expense and sale descriptions.
+
+The text index lives in the database and is maintained by the database, so
+ORM writes, bulk ingest (COPY / executemany) and deletes all keep it current
+without application code:
+
+- SQLite: an FTS5 table per searchable table using the base table as external
+  content, kept in sync by ``AFTER INSERT/UPDATE/DELETE`` triggers. Ranked by
+  FTS5's bm25 ``rank``.
+- PostgreSQL: a GIN index on the ``to_tsvector`` of the searchable columns.
+  Queries use the identical expression so the planner can use the index.
+  Ranked by ``ts_rank``.
+
+Both are created by ``migrations.py``. A search matches rows containing every
+word of the query, each as a prefix ("cost" finds "Costco"). Ranking has to
+score the whole matched set, so results are paged by offset rather than by
+``(date, id)`` keyset; the offset is carried in the pager's cursor arguments.
+"""
+import re
+
+from sqlalchemy import column, func, literal_column, table
+
+from pagination import DEFAULT_PER_PAGE, Page
+
+# Searchable columns per table name
+COLUMNS = {
+    'expense': ('description', 'category'),
+    'sale': ('description',),
+}
+
+# Text search configuration: no stemming or stop words, as most searches are
+# for shop and product names
+CONFIG = 'simple'
+MAX_TERMS = 8
+
+_TERM = re.compile(r'[^\W_]+')
+
+
+def searchable(model):
+    return model.__tablename__ in COLUMNS
+
+
+def fts_table(name):
+    return f'{name}_fts'
+
+
+def index_name(name):
+    return f'ix_{name}_search'
+
+
+def terms(q):
+    """The words of a search query, lower-cased; punctuation is ignored."""
+    return _TERM.findall((q or '').lower())[:MAX_TERMS]
+
+
+def document_sql(columns):
+    """The indexed ``tsvector`` expression on PostgreSQL (queries must repeat it exactly)."""
+    text = " || ' ' || ".join(f"coalesce(\"{name}\", '')" for name in columns)
+    return f"to_tsvector('{CONFIG}', {text})"
+
+
+def sqlite_ddl(name, columns):
+    """Statements creating the FTS5 table and its triggers, then indexing existing rows."""
+    fts = fts_table(name)
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column_name}' for column_name in columns)
+    old = ', '.join(f'old.{column_name}' for column_name in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{name}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {name} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def apply_search(query, model, q, dialect):
+    """
+    Restrict ``query`` to rows of ``model`` matching ``q``.
+
+    Returns the filtered query and the ORDER BY clauses, best match first.
+    """
+    words = terms(q)
+    name = model.__tablename__
+    if dialect == 'postgresql':
+        document = literal_column(document_sql(COLUMNS[name]))
+        tsquery = func.to_tsquery(literal_column(f"'{CONFIG}'"), ' & '.join(f'{word}:*' for word in words))
+        query = query.filter(document.op('@@')(tsquery))
+        rank = func.ts_rank(document, tsquery).desc()
+    else:
+        fts = table(fts_table(name), column('rowid'), column('rank'))
+        match = ' '.join(f'"{word}"*' for word in words)
+        query = query.join(fts, fts.c.rowid == model.id) \
+            .filter(literal_column(fts_table(name)).op('MATCH')(match))
+        # bm25 scores are negative; lower is a better match
+        rank = fts.c.rank.asc()
+    return query, (rank, model.date.desc(), model.id.desc())
+
+
+def _offset(token):
+    try:
+        return max(int(token), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def ranked_page(query, order_by, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Fetch one page of ranked results starting at the offset in ``after`` or ``before``.
+
+    Cursors are offsets, so both directions use the same argument shape as
+    ``keyset_page`` and the listing pager works unchanged.
+    """
+    offset = _offset(after if after is not None else before)
+    rows = query.order_by(*order_by).offset(offset).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = str(offset + per_page) if has_more else None
+    prev_cursor = str(max(offset - per_page, 0)) if offset else None
+    return Page(rows, next_cursor, prev_cursor, per_page)
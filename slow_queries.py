@@ -0,0 +1,221 @@
+"""
+Slow-query log with captured query plans.
+
+Statements that take longer than ``SLOW_QUERY_MS`` are logged with their
+parameters, the route (or background thread) that ran them and the query
+plan: ``EXPLAIN`` on PostgreSQL, ``EXPLAIN QUERY PLAN`` on SQLite, run on the
+same connection right after the statement. Plans are captured once per
+distinct statement every ``PLAN_TTL`` seconds rather than on every slow run.
+
+Each worker also keeps totals per distinct statement since it started and
+writes them next to its metrics snapshot, so the admin view can list the
+statements with the most total slow time across all workers.
+"""
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+PLAN_TTL = 600
+MAX_STATEMENTS = 200
+MAX_PARAMS_LENGTH = 500
+
+_EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+
+def settings(env=None):
+    env = os.environ if env is None else env
+    return {
+        'threshold_ms': float(env.get('SLOW_QUERY_MS', 250)),
+        'explain': env.get('SLOW_QUERY_EXPLAIN', '1').lower() in ('1', 'true', 'yes', 'on'),
+    }
+
+
+def fingerprint(statement):
+    """The statement with whitespace collapsed and IN lists shortened."""
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    return re.sub(r'\((?:\?|%\([^)]*\)s|%s)(?:, (?:\?|%\([^)]*\)s|%s))+\)', '(...)', statement)
+
+
+def _params(parameters, executemany):
+    if executemany:
+        return f'<{len(parameters)} parameter sets>'
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMS_LENGTH else text[:MAX_PARAMS_LENGTH] + '...'
+
+
+def _source():
+    if has_request_context():
+        return f'{request.method} {request.endpoint or request.path}'
+    return f'thread {threading.current_thread().name}'
+
+
+def explain(dbapi_connection, dialect, statement, parameters):
+    """Return the plan of ``statement`` as text, or None if it cannot be explained."""
+    if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    cursor = dbapi_connection.cursor()
+    # On PostgreSQL a failed EXPLAIN must not abort the caller's transaction
+    savepoint = dialect == 'postgresql' and not getattr(dbapi_connection, 'autocommit', False)
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows = cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return f'EXPLAIN failed: {e}'
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if dialect == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+class SlowQueryLog:
+    """Per-statement totals of slow queries since the worker started."""
+
+    def __init__(self, directory=None, maxsize=MAX_STATEMENTS):
+        self.directory = directory
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._statements = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def needs_plan(self, key):
+        with self._lock:
+            entry = self._statements.get(key)
+            return entry is None or time.time() - entry['plan_captured_at'] > PLAN_TTL
+
+    def record(self, key, seconds, params, source, plan=None):
+        now = time.time()
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                if len(self._statements) >= self.maxsize:
+                    # Forget the statement with the least slow time
+                    del self._statements[min(self._statements, key=lambda k: self._statements[k]['total_s'])]
+                entry = self._statements[key] = {
+                    'statement': key, 'count': 0, 'total_s': 0.0, 'max_s': 0.0,
+                    'sources': {}, 'plan': None, 'plan_captured_at': 0.0,
+                }
+            entry['count'] += 1
+            entry['total_s'] += seconds
+            entry['max_s'] = max(entry['max_s'], seconds)
+            entry['last_seen'] = now
+            entry['last_params'] = params
+            entry['sources'][source] = entry['sources'].get(source, 0) + 1
+            if plan is not None:
+                entry['plan'] = plan
+                entry['plan_captured_at'] = now
+        self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(entry, sources=dict(entry['sources'])) for entry in self._statements.values()]
+
+    def _path(self):
+        return os.path.join(self.directory, f'slow-queries-{os.getpid()}.json')
+
+    def flush(self):
+        if not self.directory:
+            return
+        path = self._path()
+        tmp = f'{path}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith('slow-queries-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def top(self, limit=20):
+        """Slow statements across all workers, most total time first."""
+        merged = {}
+        for snapshot in self._snapshots():
+            for entry in snapshot:
+                into = merged.get(entry['statement'])
+                if into is None:
+                    merged[entry['statement']] = dict(entry, sources=dict(entry['sources']))
+                    continue
+                into['count'] += entry['count']
+                into['total_s'] += entry['total_s']
+                into['max_s'] = max(into['max_s'], entry['max_s'])
+                for source, count in entry['sources'].items():
+                    into['sources'][source] = into['sources'].get(source, 0) + count
+                if entry['last_seen'] > into['last_seen']:
+                    into['last_seen'] = entry['last_seen']
+                    into['last_params'] = entry['last_params']
+                if entry['plan'] and entry['plan_captured_at'] > into['plan_captured_at']:
+                    into['plan'] = entry['plan']
+                    into['plan_captured_at'] = entry['plan_captured_at']
+        entries = sorted(merged.values(), key=lambda entry: entry['total_s'], reverse=True)[:limit]
+        for entry in entries:
+            entry['mean_ms'] = round(entry['total_s'] / entry['count'] * 1000, 1)
+            entry['max_ms'] = round(entry.pop('max_s') * 1000, 1)
+            entry['total_s'] = round(entry['total_s'], 3)
+            entry['last_seen'] = datetime.fromtimestamp(entry['last_seen']).isoformat(timespec='seconds')
+            captured = entry.pop('plan_captured_at')
+            entry['plan_captured'] = datetime.fromtimestamp(captured).isoformat(timespec='seconds') \
+                if captured else None
+        return entries
+
+
+def install(engine, log, config, logger=None):
+    """Time every statement on ``engine`` and record those over the threshold."""
+    threshold = config['threshold_ms'] / 1000
+    dialect = engine.dialect.name
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('slow_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if elapsed < threshold:
+            return
+        key = fingerprint(statement)
+        params = _params(parameters, executemany)
+        source = _source()
+        plan = None
+        if config['explain'] and not executemany and log.needs_plan(key):
+            try:
+                plan = explain(conn.connection.dbapi_connection, dialect, statement, parameters)
+            except Exception as e:
+                plan = f'EXPLAIN failed: {e}'
+        log.record(key, elapsed, params, source, plan)
+        if logger is not None:
+            logger.warning('Slow query (%.0f ms) from %s: %s | params=%s%s', elapsed * 1000, source,
+                           re.sub(r'\s+', ' ', statement).strip(), params,
+                           f'\n{plan}' if plan else '')
@@ -0,0 +1,41 @@
+"""
+One-time schema initialisation shared by every process on an instance.
+
+Importing ``app`` has no database side effects. ``app.init_db()`` creates
+missing tables and builds the ledger the first time it runs in a process:
+in the gunicorn master when ``preload_app`` is on (workers then inherit the
+result copy-on-write), otherwise on each worker's first request. Concurrent
+callers are serialised with an ``flock``-ed file on the instance and, on
+PostgreSQL, an advisory lock across instances, so two workers never race
+through ``CREATE TABLE`` or the first ledger build.
+"""
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), 'londons_kitchen_init.lock')
+
+# PostgreSQL advisory lock key (migrations.py uses its own)
+LOCK_KEY = 7305_2026
+
+
+@contextmanager
+def init_lock(engine, path=LOCK_PATH):
+    """Hold the instance-wide (and on PostgreSQL, database-wide) init lock."""
+    with open(path, 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            if engine.dialect.name != 'postgresql':
+                yield
+                return
+            with engine.connect() as connection:
+                connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': LOCK_KEY})
+                try:
+                    yield
+                finally:
+                    connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': LOCK_KEY})
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
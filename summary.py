@@ -0,0 +1,87 @@
+"""
+Page summaries in a single round trip.
+
+One statement returns every ledger row (table totals and counts, per-investor
+sums and the data version) followed by the most recent expenses and sales
+merged by date:
+
+    SELECT 'ledger', key, total, count, NULL FROM ledger_total
+    UNION ALL
+    SELECT * FROM (
+        SELECT * FROM (SELECT 'expense', ... ORDER BY date DESC LIMIT n)
+        UNION ALL
+        SELECT * FROM (SELECT 'sale', ... ORDER BY date DESC LIMIT n)
+    ) ORDER BY date DESC LIMIT n
+
+Each branch of the feed is limited on its own first, so both are read from the
+``(date, id)`` indexes rather than sorting the whole tables.
+"""
+from collections import namedtuple
+
+from sqlalchemy import DateTime, Integer, String, cast, literal, null, select, union_all
+
+import ledger
+
+LEDGER = 'ledger'
+RECENT_LIMIT = 10
+MAX_RECENT = 50
+
+Activity = namedtuple('Activity', ['kind', 'description', 'amount', 'date'])
+
+
+def _recent(model, kind, limit):
+    return select(
+        literal(kind, String).label('kind'),
+        model.description.label('label'),
+        model.amount.label('amount'),
+        cast(null(), Integer).label('count'),
+        model.date.label('date'),
+    ).order_by(model.date.desc(), model.id.desc()).limit(limit).subquery()
+
+
+def statement(ledger_model, expense_model, sale_model, recent=RECENT_LIMIT):
+    """The combined ledger + recent-activity SELECT."""
+    totals = select(
+        literal(LEDGER, String).label('kind'),
+        ledger_model.key.label('label'),
+        ledger_model.total.label('amount'),
+        ledger_model.count.label('count'),
+        cast(null(), DateTime).label('date'),
+    )
+    if not recent:
+        return totals
+    branches = union_all(
+        select(_recent(expense_model, ledger.EXPENSE, recent)),
+        select(_recent(sale_model, ledger.SALE, recent)),
+    ).subquery()
+    feed = select(branches).order_by(branches.c.date.desc()).limit(recent).subquery()
+    return union_all(totals, select(feed))
+
+
+def load(session, ledger_model, expense_model, sale_model, recent=RECENT_LIMIT):
+    """
+    Return the summary figures for the overview pages.
+
+    Keys: ``total_investment``, ``total_expenses``, ``total_sales``, the three
+    ``*_count`` values, ``investors`` (name -> total), ``data_version`` and
+    ``recent`` (newest first, a list of ``Activity``).
+    """
+    rows = {}
+    activity = []
+    for kind, label, amount, count, date in session.execute(
+            statement(ledger_model, expense_model, sale_model, recent)):
+        if kind == LEDGER:
+            rows[label] = (float(amount or 0), count or 0)
+        else:
+            activity.append(Activity(kind, label, float(amount), date))
+
+    figures = {'investors': {}, 'recent': activity}
+    for name, key in (('investment', ledger.INVESTMENT), ('expenses', ledger.EXPENSE),
+                      ('sales', ledger.SALE)):
+        figures[f'total_{name}'], figures[f'{key}_count'] = rows.get(key, (0.0, 0))
+    figures['data_version'] = rows.get(ledger.DATA_VERSION, (0.0, 0))[1]
+    prefix = ledger.investor_key('')
+    for key, (total, _) in rows.items():
+        if key.startswith(prefix):
+            figures['investors'][key[len(prefix):]] = total
+    return figures
@@ -0,0 +1,169 @@
+"""
+Streaming raw-table exports as CSV, NDJSON or Parquet.
+
+Each export is a generator of byte chunks suitable for a streaming HTTP
+response or for writing to a file. Rows are never all held in memory: on
+PostgreSQL, CSV comes straight from ``COPY ... TO STDOUT``; elsewhere rows are
+fetched from a streaming cursor in chunks and encoded chunk by chunk.
+Parquet needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+import json
+import queue
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+CHUNK_SIZE = 5000
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class ExportError(Exception):
+    """Raised for an unsupported format or a missing optional dependency."""
+
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _row_chunks(engine, table, chunk_size):
+    """Yield lists of rows from a streaming cursor ordered by primary key."""
+    stmt = select(*table.columns).order_by(*table.primary_key.columns)
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size) \
+            .execute(stmt)
+        for partition in result.partitions(chunk_size):
+            yield partition
+
+
+def _csv_rows(engine, table, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow([column.name for column in table.columns])
+    for rows in _row_chunks(engine, table, chunk_size):
+        writer.writerows([[_text(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _copy_csv(engine, table):
+    """Stream ``COPY (SELECT ...) TO STDOUT`` output from a helper thread."""
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    order = ', '.join(f'"{column.name}"' for column in table.primary_key.columns)
+    sql = f'COPY (SELECT {columns} FROM "{table.name}" ORDER BY {order}) TO STDOUT WITH CSV HEADER'
+
+    chunks = queue.Queue(maxsize=16)
+    stop = threading.Event()
+
+    class Sink:
+        def write(self, data):
+            if stop.is_set():
+                raise IOError('export cancelled')
+            chunks.put(data.encode() if isinstance(data, str) else bytes(data))
+
+    def run():
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            # A large table can take longer than the web statement timeout
+            cursor.execute('SET LOCAL statement_timeout = 0')
+            cursor.copy_expert(sql, Sink(), size=COPY_BUFFER_SIZE)
+            cursor.close()
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            raw.close()
+
+    thread = threading.Thread(target=run, name='copy-export', daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Client went away: let the COPY thread fail on its next write
+        stop.set()
+        while thread.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _ndjson_rows(engine, table, chunk_size):
+    names = [column.name for column in table.columns]
+    for rows in _row_chunks(engine, table, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(names, (_text(value) for value in row)))) + '\n'
+            for row in rows).encode()
+
+
+def _arrow_type(pa, column):
+    python_type = column.type.python_type
+    if python_type is int:
+        return pa.int64()
+    if python_type is float:
+        return pa.float64()
+    if python_type is datetime:
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _parquet_rows(engine, table, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column.name, _arrow_type(pa, column)) for column in table.columns])
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in _row_chunks(engine, table, chunk_size):
+        writer.write_table(pa.Table.from_pylist([dict(row._mapping) for row in rows], schema=schema))
+        # Hand over each finished row group and reuse the buffer
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def stream_table(engine, table, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Return a generator of byte chunks exporting ``table`` in ``fmt``.
+
+    Validation (format, optional dependencies) happens before the generator
+    is returned, so callers can report errors instead of sending a broken
+    body.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+    if fmt == 'csv':
+        if engine.dialect.name == 'postgresql':
+            return _copy_csv(engine, table)
+        return _csv_rows(engine, table, chunk_size)
+    if fmt == 'ndjson':
+        return _ndjson_rows(engine, table, chunk_size)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ExportError("Parquet export requires the 'pyarrow' package")
+    return _parquet_rows(engine, table, chunk_size)
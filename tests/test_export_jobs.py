@@ -0,0 +1,46 @@
+"""
+Export job expiry, against a temporary job directory.
+
+Run with ``python -m pytest tests``.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_jobs import DONE, ExportJobs  # noqa: E402
+
+
+def finished_job(jobs, age):
+    job_id = jobs.submit(lambda f: f.write(b'report'))
+    deadline = time.time() + 5
+    while jobs.status(job_id)['status'] != DONE and time.time() < deadline:
+        time.sleep(0.01)
+    state = jobs.status(job_id)
+    jobs._write_state(job_id, **dict(state, finished=state['finished'] - age))
+    return job_id
+
+
+def test_status_expires_finished_jobs_after_the_ttl(tmp_path):
+    jobs = ExportJobs(str(tmp_path), ttl=60, poll_interval=0.01)
+    fresh = finished_job(jobs, age=0)
+    stale = finished_job(jobs, age=120)
+
+    assert jobs.status(fresh)['status'] == DONE
+    assert jobs.status(stale) is None
+    assert not os.path.exists(jobs.output_path(stale))
+    assert os.path.exists(jobs.output_path(fresh))
+
+
+def test_status_sweeps_old_files(tmp_path):
+    jobs = ExportJobs(str(tmp_path), ttl=60, cleanup_interval=0, poll_interval=0.01)
+    job_id = finished_job(jobs, age=0)
+    old = time.time() - 120
+    for path in (jobs._state_path(job_id), jobs.output_path(job_id)):
+        os.utime(path, (old, old))
+
+    jobs.status('0' * 32)
+
+    # Only the slot lock files are left
+    assert all(name.startswith('.') for name in os.listdir(tmp_path))
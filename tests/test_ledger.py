@@ -0,0 +1,76 @@
+"""
+Ledger maintenance through the HTTP routes, against a throwaway SQLite database.
+
+Run with ``python -m pytest tests``.
+"""
+import os
+import sys
+import tempfile
+
+# A throwaway database; must be set before app is imported
+_db_dir = tempfile.mkdtemp(prefix='ledger_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'ledger.db')}"
+os.environ.setdefault('EXPORT_JOB_DIR', os.path.join(_db_dir, 'exports'))
+os.environ.setdefault('METRICS_DIR', os.path.join(_db_dir, 'metrics'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+import ledger  # noqa: E402
+from app import app, db, init_db, Investment  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    init_db()
+    return app.test_client()
+
+
+def add_investment(client, name, amount='100'):
+    client.post('/add_investment', json={'investor_name': name, 'amount': amount, 'date': '2025-03-04'})
+    with app.app_context():
+        return db.session.query(func.max(Investment.id)).scalar()
+
+
+def investors(client):
+    return {investor['name']: investor['total']
+            for investor in client.get('/api/v1/summary').get_json()['investors']}
+
+
+def assert_ledger_matches():
+    with app.app_context():
+        assert ledger.verify(db.session) == []
+        db.session.remove()
+
+
+def test_renaming_an_investors_last_investment_removes_the_old_name(client):
+    investment_id = add_investment(client, 'Rename Old')
+    assert investors(client)['Rename Old'] == 100.0
+
+    client.post(f'/edit_investment/{investment_id}',
+                json={'investor_name': 'Rename New', 'amount': '100', 'date': '2025-03-04'})
+
+    names = investors(client)
+    assert 'Rename Old' not in names
+    assert names['Rename New'] == 100.0
+    with app.app_context():
+        assert ledger.read(db.session, [ledger.investor_key('Rename Old')]) == {}
+    assert_ledger_matches()
+
+
+def test_deleting_an_investors_last_investment_removes_the_investor(client):
+    investment_id = add_investment(client, 'Delete Me')
+    client.post(f'/delete_investment/{investment_id}')
+
+    assert 'Delete Me' not in investors(client)
+    assert_ledger_matches()
+
+
+def test_investor_with_remaining_investments_keeps_its_row(client):
+    add_investment(client, 'Keep Me', '40')
+    investment_id = add_investment(client, 'Keep Me', '60')
+    client.post(f'/delete_investment/{investment_id}')
+
+    assert investors(client)['Keep Me'] == 40.0
+    assert_ledger_matches()
@@ -0,0 +1,62 @@
+"""
+Worker warm-up before serving traffic.
+
+A freshly started worker has an empty connection pool, compiles each Jinja
+template on first render and has nothing in its summary cache, so its first
+requests are slow. ``run`` executes named warm-up steps in order and records
+how long each took; gunicorn calls the app's ``warm_up()`` from
+``post_worker_init``, before the worker accepts connections, and the
+readiness endpoint reports not-ready until it has finished.
+"""
+import threading
+import time
+
+
+class WarmupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = False
+        self.steps = {}
+        self.error = None
+
+    def as_dict(self):
+        return {'done': self.done, 'steps': dict(self.steps), 'error': self.error}
+
+
+def open_connections(engine, count):
+    """Check out ``count`` connections at once so the pool keeps them open."""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def compile_templates(jinja_env):
+    """Load every template into the environment's cache; returns the count."""
+    names = jinja_env.list_templates(extensions=('html',))
+    for name in names:
+        jinja_env.get_template(name)
+    return len(names)
+
+
+def run(state, steps):
+    """Run ``(name, func)`` steps once; later calls return immediately."""
+    with state.lock:
+        if state.done:
+            return state
+        state.error = None
+        for name, func in steps:
+            started = time.perf_counter()
+            try:
+                result = func()
+            except Exception as e:
+                state.error = f'{name}: {e}'
+                return state
+            state.steps[name] = {'ms': round((time.perf_counter() - started) * 1000, 1),
+                                 'result': result}
+        state.done = True
+    return state